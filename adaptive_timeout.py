@@ -0,0 +1,67 @@
+# Request timeouts derived from recent latency
+#
+# http_client.post() asks timeouts(endpoint) for a (connect, read) pair
+# unless the caller passes its own. The read timeout is P99_MULTIPLIER times
+# the p99 of the last WINDOW_SIZE response times of that endpoint, kept
+# between READ_FLOOR and READ_CEILING, so a hung request frees its worker
+# soon after the API's usual worst case instead of after a fixed 30s. Calls
+# that hit the read timeout are counted at the timeout, so when the API
+# slows down for real the p99, and the timeout with it, grows towards the
+# ceiling instead of cutting every slow job off. Until MIN_SAMPLES
+# responses have been seen READ_TIMEOUT is used. Connecting does not depend
+# on how long a research job takes, so it has its own short timeout.
+#
+# http_client.deadline() adds a per-item budget on top: each call's timeouts
+# are cut to what is left of it, and once it has run out DeadlineExceeded is
+# raised instead of sending.
+
+import threading
+from collections import deque
+
+import requests
+
+import metrics
+
+CONNECT_TIMEOUT = 5.0  # seconds to establish a connection
+READ_TIMEOUT = 30.0  # seconds to wait for a response until enough latencies are known
+P99_MULTIPLIER = 3.0  # read timeout as a multiple of the recent p99 latency
+READ_FLOOR = 5.0  # shortest read timeout, seconds
+READ_CEILING = 300.0  # longest read timeout, seconds
+WINDOW_SIZE = 500  # most recent response times per endpoint considered
+MIN_SAMPLES = 20  # response times needed before the p99 is trusted
+
+_lock = threading.Lock()
+_windows = {}  # endpoint -> deque of response times, seconds
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised instead of sending once the item's deadline budget has run out"""
+
+def observe(endpoint, seconds):
+    """Record how long a call to `endpoint` waited for its response (or its timeout)"""
+    with _lock:
+        window = _windows.get(endpoint)
+        if window is None:
+            window = _windows[endpoint] = deque(maxlen=WINDOW_SIZE)
+        window.append(seconds)
+
+def p99(endpoint):
+    """p99 of the recent response times of `endpoint`, or None while there are too few"""
+    with _lock:
+        samples = sorted(_windows.get(endpoint, ()))
+    if len(samples) < MIN_SAMPLES:
+        return None
+    return samples[min(len(samples) - 1, int(0.99 * len(samples)))]
+
+def read_timeout(endpoint):
+    """Read timeout in seconds for the next call to `endpoint`, exported as a gauge"""
+    latency = p99(endpoint)
+    if latency is None:
+        timeout = READ_TIMEOUT
+    else:
+        timeout = min(READ_CEILING, max(READ_FLOOR, P99_MULTIPLIER * latency))
+    metrics.set_gauge("batcher_read_timeout_seconds", round(timeout, 3), endpoint=endpoint)
+    return timeout
+
+def timeouts(endpoint):
+    """(connect, read) timeouts in seconds for the next call to `endpoint`"""
+    return CONNECT_TIMEOUT, read_timeout(endpoint)
@@ -0,0 +1,209 @@
+# Concurrent submission engine shared by the batch processors
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import metrics
+from retry_policy import DelayedQueue, was_sent
+
+MAX_IN_FLIGHT = 4  # default number of requests allowed in flight at once
+IDLE_WAIT = 1.0  # seconds a worker waits after `items` yielded IDLE before asking again
+
+IDLE = object()  # yielded by an endless `items` stream that has nothing to send right now
+
+logger = logging.getLogger(__name__)
+
+def run_concurrent(items, send, on_success=None, on_failure=None, max_in_flight=MAX_IN_FLIGHT,
+                   on_start=None, retry=None, on_retry=None, concurrency=None, admit=None, stop=None):
+    """Send every item with at most max_in_flight requests outstanding.
+
+    `send` is the processor's blocking sender (e.g. ``lambda url: send_urls([url])``)
+    and runs on a worker thread; its return value is treated as success when
+    truthy. `on_start(item)` runs right before each send and `on_success(item, result)`
+    / `on_failure(item, result, attempts)` as each result lands, all on the
+    event loop thread, so progress writes never interleave.
+
+    `admit(item)` runs on the worker thread before each send and may block,
+    typically for a rate-limit token (http_client.admit). A send only counts
+    as in flight once it has been admitted; if `admit` returns a result
+    instead of None, that result stands for the attempt and nothing is sent.
+
+    With a `retry` policy (retry_policy.RetryPolicy), failures it deems
+    retryable go to a delayed queue and `on_retry(item, result, delay)` is
+    called instead of `on_failure`; a try the API never saw (was_sent) is
+    retried under the same attempt number. Workers take due retries first
+    and fresh items otherwise, so waiting retries never hold up new work. A
+    policy `deadline` bounds each item from its first admitted send, not
+    counting time spent waiting in `admit`: sends run inside
+    http_client.deadline(), and a retry that could not start before the
+    deadline fails the item instead, without being admitted.
+
+    `items` is consumed lazily, one item per free worker, so it can be a
+    generator over an arbitrarily large input. A stream that waits for new
+    input (e.g. file_watcher.follow) yields IDLE instead of blocking; the
+    worker then waits up to IDLE_WAIT seconds, or until a send finishes,
+    and asks again.
+
+    Once `stop` (a threading.Event, e.g. file_watcher.stop_on_signals) is
+    set, no fresh item, waiting retry or admitted item is sent any more; the
+    sends in flight finish and the call returns. Items cut off that way are
+    neither successes nor failures and are left for the next run.
+
+    With a `concurrency` controller (concurrency_control.AimdController),
+    its `limit` replaces max_in_flight (counting items waiting in `admit`)
+    and every result is reported to it, so the number of requests in flight
+    follows the API's capacity.
+    Returns (succeeded, failed) counts.
+    """
+    if concurrency is not None:
+        max_in_flight = concurrency.maximum
+    return asyncio.run(_run(items, send, on_success, on_failure, max_in_flight, on_start, retry, on_retry,
+                            concurrency, admit, stop))
+
+async def _run(items, send, on_success, on_failure, max_in_flight, on_start, retry, on_retry, concurrency, admit,
+               stop):
+    loop = asyncio.get_running_loop()
+    fresh = iter(items)
+    retries = DelayedQueue()
+    wake = asyncio.Event()  # set whenever a send finishes or a worker exits
+    succeeded = 0
+    failed = 0
+    sending = 0
+    admitting = 0  # items waiting in admit(), not yet in flight
+    exhausted = False
+    poll = None if stop is None else IDLE_WAIT  # longest wait before `stop` is looked at again
+
+    def record_depth():
+        metrics.set_gauge("batcher_engine_items", sending, state="in_flight")
+        metrics.set_gauge("batcher_engine_items", len(retries), state="waiting_retry")
+
+    def next_entry():
+        nonlocal exhausted
+        if stop is not None and stop.is_set():
+            if not exhausted or retries:
+                exhausted = True
+                dropped = retries.clear()
+                logger.info(f"Stopping: no new sends; {dropped} waiting retries left for the next run")
+            return None
+        entry = retries.pop_ready()
+        if entry is not None:
+            return entry
+        if not exhausted:
+            for item in fresh:
+                if item is IDLE:
+                    return IDLE
+                return item, 1, None  # the deadline starts once the first attempt is admitted
+            exhausted = True
+        return None
+
+    async def worker(executor):
+        nonlocal succeeded, failed, sending, admitting
+        while True:
+            if concurrency is not None and sending + admitting >= concurrency.limit:
+                # Over the adaptive limit: wait for a send to finish
+                wake.clear()
+                await wake.wait()
+                continue
+            entry = next_entry()
+            if entry is IDLE:
+                wake.clear()
+                delay = retries.next_delay()
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=IDLE_WAIT if delay is None else min(delay, IDLE_WAIT))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if entry is None:
+                if exhausted and not retries and not sending:
+                    wake.set()
+                    return
+                # Nothing due yet: sleep until the next retry or until another send finishes
+                wake.clear()
+                delay = retries.next_delay()
+                if poll is not None:
+                    delay = poll if delay is None else min(delay, poll)
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            item, attempt, deadline = entry
+            result = None
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.info(f"Not sending {item}: its deadline has passed")
+                result = http_client.SendResult(False, error="deadline passed before the attempt could start",
+                                                error_type="DeadlineExceeded")
+            elif admit is not None:
+                admitting += 1
+                admit_start = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(executor, admit, item)
+                except Exception as e:
+                    logger.exception(f"Unexpected error admitting {item}: {e}")
+                    result = False
+                finally:
+                    admitting -= 1
+                if deadline is not None:
+                    deadline += time.monotonic() - admit_start  # waiting for a token is not spent on the item
+            if deadline is None and result is None and retry is not None and retry.deadline is not None:
+                deadline = time.monotonic() + retry.deadline
+            if result is None and stop is not None and stop.is_set():
+                wake.set()
+                continue  # admitted after the stop: leave it for the next run
+            in_flight = sending
+            if result is None:
+                if on_start:
+                    on_start(item)
+                sending += 1
+                in_flight = sending
+                record_depth()
+                try:
+                    result = await loop.run_in_executor(executor, _send_within, send, item, deadline)
+                except Exception as e:
+                    logger.exception(f"Unexpected error sending {item}: {e}")
+                    result = False
+                finally:
+                    sending -= 1
+            wake.set()
+
+            if concurrency is not None:
+                concurrency.record(result, in_flight)
+            delay = None
+            if not result and retry is not None and result is not False and retry.should_retry(result, attempt):
+                delay = retry.delay(result, attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    logger.info(f"Not retrying {item}: attempt {attempt + 1} would start after its deadline")
+                    delay = None
+
+            if result:
+                succeeded += 1
+                metrics.inc("batcher_items_total", outcome="success")
+                if on_success:
+                    on_success(item, result)
+            elif delay is not None:
+                retries.push(item, attempt + 1 if was_sent(result) else attempt, delay, deadline)
+                metrics.inc("batcher_items_total", outcome="retry")
+                if on_retry:
+                    on_retry(item, result, delay)
+            else:
+                failed += 1
+                metrics.inc("batcher_items_total", outcome="failure")
+                if on_failure:
+                    on_failure(item, result, attempt)
+            record_depth()
+
+    max_in_flight = max(1, max_in_flight)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        await asyncio.gather(*(worker(executor) for _ in range(max_in_flight)))
+    record_depth()
+
+    return succeeded, failed
+
+def _send_within(send, item, deadline):
+    """Run send(item) on a worker thread with the item's deadline in force"""
+    with http_client.deadline(deadline):
+        return send(item)
@@ -0,0 +1,42 @@
+# Benchmark: sequential vs concurrent submission against the local mock API
+
+import argparse
+import contextlib
+import io
+import time
+
+import startup_batch_processor as processor
+from batch_engine import run_concurrent
+from mock_research_api import start_mock_server
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and concurrent submission")
+    parser.add_argument("--items", type=int, default=40, help="number of companies to submit")
+    parser.add_argument("--latency", type=float, default=0.25, help="mock API latency in seconds")
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(latency=args.latency)
+    processor.API_URL = f"{base_url}/api/v1/research/"
+    urls = [f"https://bench-{i}.example.com" for i in range(args.items)]
+    send = lambda url: processor.send_urls([url])
+
+    print(f"Mock API latency: {args.latency * 1000:.0f} ms, {args.items} companies")
+    baseline = timed(lambda: [send(url) for url in urls])
+    print(f"sequential        {baseline:7.2f}s  {args.items / baseline:7.1f} items/s")
+
+    for in_flight in args.in_flight:
+        elapsed = timed(lambda: run_concurrent(urls, send, max_in_flight=in_flight))
+        print(f"in-flight={in_flight:<3}     {elapsed:7.2f}s  {args.items / elapsed:7.1f} items/s"
+              f"  ({baseline / elapsed:.1f}x)")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
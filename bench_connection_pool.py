@@ -0,0 +1,64 @@
+# Benchmark: fresh connection per request vs the pooled keep-alive client, over TLS
+
+import argparse
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+
+import requests
+
+import http_client
+from mock_research_api import start_mock_server
+
+def make_certificate(directory):
+    """Create a throwaway self-signed certificate for localhost"""
+    certfile = os.path.join(directory, "localhost.pem")
+    keyfile = os.path.join(directory, "localhost.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+         "-keyout", keyfile, "-out", certfile],
+        check=True, capture_output=True,
+    )
+    return certfile, keyfile
+
+def measure(post, url, count, certfile):
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        response = post(url, json={"urls": [f"https://bench-{i}.example.com"]}, timeout=30, verify=certfile)
+        response.raise_for_status()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label, timings):
+    print(f"{label:<20} mean {statistics.mean(timings):7.2f} ms   p50 {statistics.median(timings):7.2f} ms"
+          f"   max {max(timings):7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request connection cost with and without pooling")
+    parser.add_argument("--requests", type=int, default=200, help="requests per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = make_certificate(directory)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certfile, keyfile)
+        server, base_url = start_mock_server(latency=0, host="localhost", ssl_context=context)
+        url = f"{base_url}/api/v1/research/"
+
+        fresh = measure(requests.post, url, args.requests, certfile)
+        pooled = measure(http_client.post, url, args.requests, certfile)
+        server.shutdown()
+
+    print(f"{args.requests} requests per mode against {url}")
+    report("new connection", fresh)
+    report("pooled keep-alive", pooled)
+    saved = statistics.mean(fresh) - statistics.mean(pooled)
+    print(f"connect + handshake saved per request: {saved:.2f} ms")
+
+if __name__ == "__main__":
+    main()
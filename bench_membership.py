@@ -0,0 +1,76 @@
+# Benchmark: memory and startup cost of the processed-URL lookup
+#
+# Compares the in-memory set of canonical keys the processors used to build
+# on every start with the memory-mapped membership index (first start, which
+# builds the index, and later starts, which reuse it). Each measurement runs
+# in a fresh interpreter so peak RSS is per approach.
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+QUERIES = 10_000  # input URLs checked against the processed set, half of them processed
+
+def write_progress(path, size):
+    with open(path, "w") as f:
+        f.writelines(f"https://www.company-{i}.example.com/\n" for i in range(size))
+
+def queries(size):
+    """URLs alternating between processed and new ones"""
+    step = max(1, size // (QUERIES // 2))
+    for i in range(0, size, step):
+        yield f"https://company-{i}.example.com"
+        yield f"https://company-{size + i}.example.com"
+
+def child(mode, path, size):
+    """Load the processed set the way `mode` does and check the queries; print the cost as JSON"""
+    sys.path.insert(0, REPO_DIR)
+    from url_keys import url_key
+
+    start = time.perf_counter()
+    if mode == "set":
+        from compact_progress import read_keys
+        _, processed = read_keys(path, url_key)
+    else:
+        from membership_index import open_index
+        processed = open_index(path, url_key)
+    loaded = time.perf_counter() - start
+    hits = sum(1 for url in queries(size) if url_key(url) in processed)
+    total = time.perf_counter() - start
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"load": loaded, "total": total, "rss_mb": rss_mb, "hits": hits}))
+
+def measure(mode, path, size):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, path, str(size)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the processed-URL set with the membership index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    print(f"{'processed':>12}  {'approach':<16} {'load (s)':>10} {'load+check (s)':>15} {'peak RSS (MB)':>14}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "processed_urls.txt")
+            write_progress(path, size)
+            # The index is built by the first "index (build)" run and reused by the second
+            for mode, label in [("set", "set of keys"), ("index", "index (build)"), ("index", "index (reuse)")]:
+                result = measure(mode, path, size)
+                print(f"{size:>12}  {label:<16} {result['load']:10.3f} {result['total']:15.3f} {result['rss_mb']:14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Benchmark: cold-start cost of the processors as the input lists grow
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = ["startup_batch_processor", "startup_batch_processor_clean", "equity_batch_processor_test"]
+
+def import_time_us(module, cwd, env):
+    """Cumulative import time of `module` in microseconds, as reported by -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)$", line)
+        if match and match.group(2) == module:
+            return int(match.group(1))
+    raise RuntimeError(f"no import time reported for {module}")
+
+def help_time_ms(module, cwd, env):
+    """Wall time of `python <module>.py --help` in milliseconds"""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, f"{module}.py"), "--help"],
+        cwd=cwd, env=env, capture_output=True, check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+def write_inputs(directory, lines):
+    for name in ["urls.txt", "urls_clean.txt"]:
+        with open(os.path.join(directory, name), "w") as f:
+            f.writelines(f"https://company-{i}.example.com\n" for i in range(lines))
+    with open(os.path.join(directory, "tickers_test.txt"), "w") as f:
+        f.writelines(f"T{i}\n" for i in range(lines))
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure processor import and --help cost for growing inputs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, PYTHONDONTWRITEBYTECODE="1")
+    print(f"{'input lines':>12}  {'module':<32} {'import (ms)':>12} {'--help (ms)':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_inputs(directory, size)
+            for module in MODULES:
+                imported = min(import_time_us(module, directory, env) for _ in range(args.repeat)) / 1000
+                if module == "startup_batch_processor":
+                    help_ms = f"{min(help_time_ms(module, directory, env) for _ in range(args.repeat)):12.1f}"
+                else:
+                    help_ms = f"{'-':>12}"
+                print(f"{size:>12}  {module:<32} {imported:12.1f} {help_ms}")
+
+if __name__ == "__main__":
+    main()
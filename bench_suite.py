@@ -0,0 +1,216 @@
+# Benchmark suite: the real processors against a local stand-in for the research API
+#
+# Each run starts mock_research_api.py in its own process with a scenario's
+# latency distribution, error rate and 429 throttling, then runs a processor's
+# main() in a fresh child process inside a scratch directory, so ledger,
+# journal, archive and retries all take part. Reported per run: items/s,
+# request latency percentiles (from the response archive), CPU seconds and
+# peak RSS of the processor. Results are appended to HISTORY_FILE and
+# compared with the last run of the same configuration.
+#
+#     python bench_suite.py                            # every scenario, both processors
+#     python bench_suite.py --scenario throttled --target research --items 1000
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HISTORY_FILE = "bench_history.jsonl"  # one JSON line per run, appended
+ITEMS = 300  # companies or tickers per run
+IN_FLIGHT = 16  # MAX_IN_FLIGHT (ceiling of the adaptive limit) for the URL processor during the benchmark
+SCENARIOS = {
+    "baseline": {"latency": 0.05, "distribution": "fixed"},
+    "lognormal": {"latency": 0.05, "distribution": "lognormal"},
+    "errors": {"latency": 0.05, "distribution": "exponential", "error_rate": 0.05},
+    "throttled": {"latency": 0.05, "distribution": "fixed", "throttle_rate": 0.05, "retry_after": 1},
+}
+TARGETS = ("research", "equity")  # startup_batch_processor, equity_batch_processor_test
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def percentile(values, q):
+    """Nearest-rank q-quantile of `values`, or None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+def start_mock(scenario):
+    """Run the mock API in its own process so its CPU is not charged to the processor"""
+    command = [sys.executable, os.path.join(HERE, "mock_research_api.py"), "--port", "0"]
+    for name, value in scenario.items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    mock = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    match = re.search(r"listening on (\S+)", mock.stdout.readline())
+    if not match:
+        mock.kill()
+        raise RuntimeError("mock API did not start")
+    return mock, match.group(1)
+
+def read_archive(directory):
+    """Latencies (seconds) and status counts of every archived response"""
+    latencies, statuses = [], {}
+    for path in sorted(glob.glob(os.path.join(directory, "archive-*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["latency_ms"] is not None:
+                    latencies.append(record["latency_ms"] / 1000)
+                status = str(record["status"])
+                statuses[status] = statuses.get(status, 0) + 1
+    return latencies, statuses
+
+def count_lines(path):
+    try:
+        with open(path) as f:
+            return sum(1 for line in f if line.strip())
+    except FileNotFoundError:
+        return 0
+
+def run_child(spec):
+    """Run one processor against the mock in the current directory; returns the measurements"""
+    from rate_limiter import TokenBucket
+
+    items = spec["items"]
+    if spec["target"] == "research":
+        import startup_batch_processor as processor
+        processor.API_URL = f"{spec['base_url']}/api/v1/research/"
+        processor.MAX_IN_FLIGHT = spec["in_flight"]
+        with open(processor.URLS_FILE, "w") as f:
+            f.writelines(f"https://bench-{i}.example.com\n" for i in range(items))
+        argv = ["--requests-per-minute", "1e9"]  # measure the processor, not the API budget
+    else:
+        import equity_batch_processor_test as processor
+        processor.API_URL = f"{spec['base_url']}/api/v2/public-company/"
+        processor.RATE_LIMITER = TokenBucket(requests_per_minute=1e9, burst=1000)
+        with open(processor.TICKERS_FILE, "w") as f:
+            f.writelines(f"B{i:05d}\n" for i in range(items))
+        argv = ["--transport", "http"]  # the test processor defaults to the in-process simulation
+
+    sys.stdout = open(os.devnull, "w")  # the processors log to stdout
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    processor.main(argv)
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    latencies, statuses = read_archive(processor.RESPONSE_ARCHIVE_DIR)
+    succeeded = count_lines(processor.PROGRESS_FILE)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "items_per_s": round(succeeded / elapsed, 2) if elapsed else None,
+        "succeeded": succeeded,
+        "requests": sum(statuses.values()),
+        "statuses": statuses,
+        "latency_p50_ms": _ms(percentile(latencies, 0.5)),
+        "latency_p95_ms": _ms(percentile(latencies, 0.95)),
+        "latency_p99_ms": _ms(percentile(latencies, 0.99)),
+        "cpu_s": round(after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime, 3),
+        "peak_rss_mb": round(after.ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+    }
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+def run(scenario_name, target, items, in_flight):
+    """Benchmark one scenario/processor pair in a scratch directory"""
+    mock, base_url = start_mock(SCENARIOS[scenario_name])
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-suite-") as workdir:
+            spec = {"target": target, "items": items, "in_flight": in_flight, "base_url": base_url}
+            result_path = os.path.join(workdir, "result.json")
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec), result_path],
+                cwd=workdir, check=True,
+            )
+            with open(result_path) as f:
+                return json.load(f)
+    finally:
+        mock.terminate()
+        mock.wait()
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path):
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def previous_run(history, entry):
+    """The latest earlier run with the same configuration, or None"""
+    config = ("scenario", "target", "items", "in_flight", "mock")
+    for past in reversed(history):
+        if all(past.get(name) == entry[name] for name in config):
+            return past
+    return None
+
+def change(current, past, name):
+    if not past or not past.get(name) or current.get(name) is None:
+        return ""
+    return f"{(current[name] - past[name]) / past[name] * 100:+.0f}%"
+
+def cell(value):
+    return "-" if value is None else f"{value:.1f}"
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        sys.path.insert(0, HERE)
+        measurements = run_child(json.loads(sys.argv[2]))
+        with open(sys.argv[3], "w") as f:
+            json.dump(measurements, f)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the processors against the local mock API")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--target", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--items", type=int, default=ITEMS, help=f"companies or tickers per run (default: {ITEMS})")
+    parser.add_argument("--in-flight", type=int, default=IN_FLIGHT,
+                        help=f"most concurrent requests for the URL processor (default: {IN_FLIGHT})")
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"results file (default: {HISTORY_FILE})")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the history")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    commit = git_commit()
+    print(f"{'scenario':<10} {'target':<9} {'items/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'cpu s':>6} {'rss MB':>7} {'reqs':>5}  vs last (items/s, p99)")
+    for scenario_name in args.scenario:
+        for target in args.target:
+            entry = {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "commit": commit,
+                "python": sys.version.split()[0],
+                "scenario": scenario_name,
+                "target": target,
+                "items": args.items,
+                "in_flight": args.in_flight,
+                "mock": SCENARIOS[scenario_name],
+            }
+            entry.update(run(scenario_name, target, args.items, args.in_flight))
+            past = previous_run(history, entry)
+            versus = f"{change(entry, past, 'items_per_s')}, {change(entry, past, 'latency_p99_ms')}" if past else "-"
+            latency = " ".join(f"{cell(entry[f'latency_{q}_ms']):>7}" for q in ("p50", "p95", "p99"))
+            print(f"{scenario_name:<10} {target:<9} {cell(entry['items_per_s']):>8} {latency} "
+                  f"{entry['cpu_s']:>6.2f} {entry['peak_rss_mb']:>7.1f} {entry['requests']:>5}  {versus}", flush=True)
+            history.append(entry)
+            if not args.no_save:
+                with open(args.history, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Circuit breaker around the research API
+#
+# One breaker per API host, shared by every sender in the process. After too
+# many consecutive failures, or too high an error rate over the recent window,
+# the breaker opens and requests fail fast with CircuitOpenError. Once
+# RESET_TIMEOUT has passed a single half-open probe is let through; its
+# outcome closes the breaker again or re-opens it for another timeout.
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = 5  # consecutive failures that open the breaker
+ERROR_RATE_THRESHOLD = 0.5  # failure ratio over the window that opens the breaker
+WINDOW_SIZE = 20  # most recent calls considered for the error rate
+MIN_CALLS = 10  # calls needed in the window before the error rate is trusted
+RESET_TIMEOUT = 30.0  # seconds the breaker stays open before a half-open probe
+STOP_POLL = 1.0  # seconds between looks at `stop` while waiting for the breaker
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending while the breaker is open"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, error_rate_threshold=ERROR_RATE_THRESHOLD,
+                 window_size=WINDOW_SIZE, min_calls=MIN_CALLS, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.window = deque(maxlen=window_size)  # True for success, False for failure
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.permits = itertools.count(1)  # numbers handed out by allow_request()
+        self.probe = None  # permit of the half-open probe in flight
+        self.listeners = []  # called as listener(breaker, old_state, new_state)
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)  # notified whenever a result is recorded
+
+    def _set_state(self, state):
+        old_state, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != old_state:
+            logger.warning(f"Circuit breaker for {self.name}: {old_state} -> {state}",
+                           extra={"host": self.name, "old_state": old_state, "state": state})
+            for listener in self.listeners:
+                listener(self, old_state, state)
+
+    def retry_after(self):
+        """Seconds until the breaker will allow a probe (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow_request(self):
+        """Return a permit (a positive number) if a request may be sent now, else None.
+
+        At most one probe while half-open; pass the permit to record() so
+        that only the probe's own result decides the half-open state.
+        """
+        with self.lock:
+            if self.state == OPEN and self.retry_after() <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return next(self.permits)
+            if self.state == HALF_OPEN and self.probe is None:
+                self.probe = next(self.permits)
+                return self.probe
+            return None
+
+    def _refusing(self):
+        if self.state == OPEN:
+            return self.retry_after() > 0
+        return self.state == HALF_OPEN and self.probe is not None
+
+    def refusing(self):
+        """Whether allow_request() would refuse right now; unlike it, never takes the half-open probe"""
+        with self.lock:
+            return self._refusing()
+
+    def wait_until_allowed(self, stop=None):
+        """Block while the breaker is refusing requests; returns False if `stop` was set meanwhile"""
+        with self.changed:
+            while self._refusing():
+                if stop is not None and stop.is_set():
+                    return False
+                timeout = self.retry_after() or None  # half-open: until the probe's result is recorded
+                if stop is not None:
+                    timeout = STOP_POLL if timeout is None else min(timeout, STOP_POLL)
+                self.changed.wait(timeout)
+            return stop is None or not stop.is_set()
+
+    def record(self, success, permit=None):
+        """Record the outcome of a request sent under `permit` from allow_request()"""
+        with self.lock:
+            self.window.append(success)
+            self.changed.notify_all()
+            if self.state == HALF_OPEN and permit is not None and permit == self.probe:
+                self.probe = None
+                if success:
+                    self.window.clear()
+                    self.consecutive_failures = 0
+                    self._set_state(CLOSED)
+                else:
+                    self._set_state(OPEN)
+                return
+            if self.state != CLOSED:
+                return  # sent before the breaker opened: counts for the window only
+
+            if success:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            failures = self.window.count(False)
+            too_many = self.consecutive_failures >= self.failure_threshold
+            too_often = len(self.window) >= self.min_calls and failures / len(self.window) >= self.error_rate_threshold
+            if too_many or too_often:
+                self._set_state(OPEN)
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # batcher_circuit_state gauge values
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def _record_transition(breaker, old_state, new_state):
+    metrics.set_gauge("batcher_circuit_state", STATE_VALUES[new_state], host=breaker.name)
+    metrics.inc("batcher_circuit_transitions_total", host=breaker.name, state=new_state)
+
+def get_breaker(url):
+    """Return the shared breaker for the host of `url`"""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        if host not in _breakers:
+            breaker = _breakers[host] = CircuitBreaker(host)
+            breaker.listeners.append(_record_transition)
+            metrics.set_gauge("batcher_circuit_state", STATE_VALUES[breaker.state], host=host)
+        return _breakers[host]
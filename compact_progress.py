@@ -0,0 +1,103 @@
+# Progress file compaction
+#
+# Progress files only ever grow: the same company is appended again under
+# another spelling (https://www.example.com/, example.com, ...) and repeated
+# runs add repeats. Compaction rewrites a file as the sorted set of canonical
+# keys, atomically via rename, so reading it costs one line per unique item.
+#
+#     python compact_progress.py processed_urls.txt
+#     python compact_progress.py --key ticker processed_tickers_test.txt
+#
+# A file another process has open as a progress journal is not compacted:
+# its appends would go to the replaced file. compact() then raises
+# BlockingIOError, and the processors simply try again on a later start.
+
+import argparse
+import os
+from datetime import datetime
+
+from progress_journal import close_journal, exclusive, repair_tail
+from url_keys import url_key
+
+DUPLICATE_RATIO_THRESHOLD = 0.2  # share of redundant lines above which processors compact on startup
+
+KEY_FUNCTIONS = {
+    "url": url_key,
+    "ticker": lambda line: line.strip().upper(),
+}
+
+def read_keys(path, key_fn=url_key):
+    """Return (number of entries, set of canonical keys) for a progress file"""
+    lines = 0
+    keys = set()
+    if not os.path.exists(path):
+        return lines, keys
+    with open(path, 'r') as f:
+        for line in f:
+            key = key_fn(line)
+            if key:
+                lines += 1
+                keys.add(key)
+    return lines, keys
+
+def needs_compaction(lines, unique, threshold=DUPLICATE_RATIO_THRESHOLD):
+    """Whether more than `threshold` of a file's `lines` are repeats of its `unique` keys"""
+    return lines > 0 and (lines - unique) / lines > threshold
+
+def write_snapshot(path, keys):
+    """Atomically replace `path` with one line per key, sorted"""
+    close_journal(path)  # its handle would keep appending to the old file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        for key in sorted(keys):
+            f.write(f"{key}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Make the rename itself durable
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def compact(path, key_fn=url_key, threshold=None):
+    """Compact `path`, or only when its duplicate ratio is above `threshold`.
+
+    Returns (entries before, entries after, whether the file was rewritten).
+    Raises BlockingIOError while another process has `path` open as a journal.
+    """
+    close_journal(path)  # commit buffered lines before reading, and drop our own lock
+    with exclusive(path):
+        repair_tail(path)
+        lines, keys = read_keys(path, key_fn)
+        if threshold is not None and not needs_compaction(lines, len(keys), threshold):
+            return lines, lines, False
+        write_snapshot(path, keys)
+    return lines, len(keys), True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rewrite progress files as sorted, deduplicated canonical keys")
+    parser.add_argument("paths", nargs="+", help="progress files to compact")
+    parser.add_argument("--key", choices=sorted(KEY_FUNCTIONS), default="url",
+                        help="how entries are canonicalized (default: url)")
+    parser.add_argument("--threshold", type=float,
+                        help="only compact files whose duplicate ratio is above this (e.g. 0.2)")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        if not os.path.exists(path):
+            print(f"[{datetime.now()}] {path} not found, skipping")
+            continue
+        try:
+            before, after, rewritten = compact(path, KEY_FUNCTIONS[args.key], args.threshold)
+        except BlockingIOError:
+            print(f"[{datetime.now()}] {path} is open in a running processor, skipping")
+            continue
+        if rewritten:
+            print(f"[{datetime.now()}] Compacted {path}: {before} -> {after} entries")
+        else:
+            print(f"[{datetime.now()}] {path}: {before} entries, below the duplicate threshold")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Adaptive in-flight limit for the engine (AIMD)
+#
+# Instead of a hand-tuned MAX_IN_FLIGHT, the engine asks an AimdController
+# how many requests may be outstanding. Every healthy response while the
+# limit is in full use adds INCREASE / limit (so about INCREASE per round of
+# `limit` responses); a congestion signal (429, 5xx, a timeout or connection
+# failure, or a latency above LATENCY_SPIKE_FACTOR times the usual latency)
+# multiplies it by DECREASE. Signals from requests sent before the last cut
+# are ignored, so one burst of 429s costs one cut, not one per request. The
+# limit therefore settles just below the API's real capacity and follows it
+# as that changes over the day; the token bucket still caps the request rate.
+
+import logging
+import threading
+import time
+
+import metrics
+
+INCREASE = 1.0  # requests added to the limit per round of healthy responses
+DECREASE = 0.5  # factor applied to the limit on a congestion signal
+LATENCY_SPIKE_FACTOR = 2.0  # latency above this multiple of the baseline is a congestion signal
+LATENCY_FLOOR = 0.05  # seconds; latencies below this are never treated as spikes
+BASELINE_ALPHA = 0.05  # weight of each healthy response in the latency baseline (EWMA)
+CONGESTION_ERROR_TYPES = {  # exceptions that mean the API or the path to it is overloaded
+    "Timeout",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "ConnectionError",
+    "CircuitOpenError",
+}
+
+logger = logging.getLogger(__name__)
+
+class AimdController:
+    """In-flight limit between `minimum` and `maximum`, adjusted by additive increase / multiplicative decrease"""
+
+    def __init__(self, initial, minimum=1, maximum=16, increase=INCREASE, decrease=DECREASE,
+                 latency_spike_factor=LATENCY_SPIKE_FACTOR):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_spike_factor = latency_spike_factor
+        self.window = float(min(max(initial, minimum), self.maximum))
+        self.baseline = None  # smoothed latency of healthy responses, seconds
+        self.last_decrease = 0.0  # monotonic time of the last cut
+        self.lock = threading.Lock()
+        metrics.set_gauge("batcher_concurrency_limit", self.limit)
+
+    @property
+    def limit(self):
+        """Requests that may be in flight right now"""
+        return int(self.window)
+
+    def congestion(self, result):
+        """Why `result` (a SendResult) signals overload, or None"""
+        status = getattr(result, "status", None)
+        if status is not None and (status == 429 or status >= 500):
+            return f"HTTP {status}"
+        if getattr(result, "error_type", None) in CONGESTION_ERROR_TYPES:
+            return result.error_type
+        latency = getattr(result, "latency", None)
+        if (status is not None and latency is not None and self.baseline is not None
+                and latency > LATENCY_FLOOR and latency > self.latency_spike_factor * self.baseline):
+            return f"latency {latency * 1000:.0f} ms (usual {self.baseline * 1000:.0f} ms)"
+        return None
+
+    def record(self, result, in_flight):
+        """Adjust the limit for one finished send; `in_flight` counts the sends outstanding when it started"""
+        if result is False or result is True:
+            return  # the sender raised, or reported no details: nothing to learn from
+        now = time.monotonic()
+        with self.lock:
+            reason = self.congestion(result)
+            if reason is not None:
+                started = now - (result.latency or 0.0)
+                if started < self.last_decrease:
+                    return  # sent at the old limit; that overload was already answered
+                old = self.limit
+                self.window = max(float(self.minimum), self.window * self.decrease)
+                self.last_decrease = now
+                if self.limit != old:
+                    logger.info(f"Congestion ({reason}): in-flight limit {old} -> {self.limit}",
+                                extra={"reason": reason, "limit": self.limit})
+            elif result.ok:
+                if result.latency is not None:
+                    self.baseline = (result.latency if self.baseline is None
+                                     else self.baseline + BASELINE_ALPHA * (result.latency - self.baseline))
+                if in_flight >= self.limit and self.window < self.maximum:
+                    # Grow only while the limit is what holds sending back
+                    self.window = min(float(self.maximum), self.window + self.increase / self.window)
+            limit = self.limit
+        metrics.set_gauge("batcher_concurrency_limit", limit)
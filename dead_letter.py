@@ -0,0 +1,55 @@
+# Dead-letter store for items that exhausted their attempts
+#
+# Failures are appended as JSON lines with their error class, HTTP status and
+# attempt count, so a replay can resubmit exactly those items without
+# re-reading the whole input list.
+
+import json
+import os
+from datetime import datetime
+
+class DeadLetterStore:
+    """Append-only JSON-lines file of failed items, latest record per item wins"""
+
+    def __init__(self, path, key_fn=None):
+        self.path = path
+        self.key_fn = key_fn or (lambda item: item)
+
+    def make_record(self, item, result, attempts):
+        return {
+            "item": item,
+            "failed_at": datetime.now().isoformat(timespec="seconds"),
+            "error_type": getattr(result, "error_type", None),
+            "status": getattr(result, "status", None),
+            "error": getattr(result, "error", None) or "unexpected error",
+            "attempts": attempts,
+        }
+
+    def add(self, item, result, attempts):
+        """Record that `item` failed with `result` after `attempts` tries"""
+        with open(self.path, "a") as f:
+            f.write(json.dumps(self.make_record(item, result, attempts)) + "\n")
+
+    def load(self):
+        """Return {key: record} for every item in the store"""
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn line from an interrupted write
+                records[self.key_fn(record["item"])] = record
+        return records
+
+    def rewrite(self, records):
+        """Atomically replace the store with `records` (an iterable of records)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -1,158 +1,439 @@
 # Listed Equities Uploads - Test Version
 
-import requests
-import time
+import argparse
+import itertools
 import json
+import logging
 import os
-from datetime import datetime
+import time
+import uuid
+import http_client
+import metrics
+import structured_log
+import transport
+from http_client import SendResult
+from progress_journal import get_journal
+from rate_limiter import TokenBucket
 
 API_URL = "https://research-api.alphax.inc/api/v2/public-company/"
 HEADERS = {
     "Content-Type": "application/json",
 }
-WAIT_TIME = 10  # seconds between batches (10 seconds for testing)
-BATCH_SIZE = 2  # smaller batch size for testing
+REQUESTS_PER_MINUTE = 12  # API budget (one request every 5 seconds for testing)
+RATE_BURST = 2  # number of requests that may be sent back-to-back when budget has built up
+MAX_TICKERS_PER_REQUEST = 2  # tickers sent in one API call (matches API_BATCH_SIZE in the Next.js runner)
+MAX_IN_FLIGHT = 4  # ceiling for the adaptive number of requests in flight (see concurrency_control.py)
+MAX_ATTEMPTS = 5  # tries per request for throttling, 5xx and transient network failures
+ITEM_DEADLINE = 600  # seconds from a request's first send within which all of its attempts must fit (rate-limit waits excluded)
+REPLAY_REQUESTS_PER_MINUTE = 6  # separate API budget for --replay-failed
+REPLAY_BURST = 1
 PROGRESS_FILE = "processed_tickers_test.txt"  # Test progress file
 TICKERS_FILE = "tickers_test.txt"  # Test tickers file
+DEAD_LETTER_FILE = "failed_tickers_test.jsonl"  # Tickers that exhausted their attempts, with error details
+RESPONSE_ARCHIVE_DIR = "responses_tickers_test"  # compressed archive of every API response, see response_archive.py
+TRANSPORT = "simulated:latency=0.5"  # test mode: an in-process model of the API; --transport http sends for real
+
+RATE_LIMITER = TokenBucket(REQUESTS_PER_MINUTE, RATE_BURST)
+
+logger = logging.getLogger("equity_batch_processor_test")
 
 def load_tickers():
     """Load tickers from external file"""
     try:
         with open(TICKERS_FILE, 'r') as f:
             tickers = [line.strip().upper() for line in f if line.strip()]
-        print(f"[{datetime.now()}] Loaded {len(tickers)} tickers from {TICKERS_FILE}")
+        logger.info(f"Loaded {len(tickers)} tickers from {TICKERS_FILE}")
         return tickers
     except FileNotFoundError:
-        print(f"[{datetime.now()}] Error: {TICKERS_FILE} not found!")
+        logger.error(f"{TICKERS_FILE} not found!")
         return []
     except Exception as e:
-        print(f"[{datetime.now()}] Error loading tickers: {e}")
+        logger.error(f"Error loading tickers: {e}")
         return []
 
-# Load tickers from external file
-TICKERS = load_tickers()
-
 def load_processed_tickers():
-    """Load the list of already processed tickers from file"""
-    processed = set()
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            for line in f:
-                ticker = line.strip().upper()
-                if ticker:
-                    processed.add(ticker)
+    """Load the list of already processed tickers from file.
+
+    A file that is mostly repeats is compacted to its unique tickers on the way.
+    """
+    from compact_progress import KEY_FUNCTIONS, compact, needs_compaction, read_keys
+
+    get_journal(PROGRESS_FILE).flush()  # repairs a torn last line on first use, and shows lines still buffered
+    entries, processed = read_keys(PROGRESS_FILE, KEY_FUNCTIONS["ticker"])
+    if needs_compaction(entries, len(processed)):
+        try:
+            before, after, _ = compact(PROGRESS_FILE, KEY_FUNCTIONS["ticker"])
+        except BlockingIOError:
+            logger.info(f"Not compacting {PROGRESS_FILE}: another processor is appending to it")
+        else:
+            logger.info(f"Compacted {PROGRESS_FILE}: {before} -> {after} tickers")
     return processed
 
 def save_processed_tickers(tickers):
-    """Save successfully processed tickers to file"""
-    with open(PROGRESS_FILE, 'a') as f:
-        for ticker in tickers:
-            f.write(f"{ticker}\n")
-    print(f"[{datetime.now()}] Saved {len(tickers)} tickers to progress file")
+    """Save successfully processed tickers to the progress journal (group-committed with fsync)"""
+    get_journal(PROGRESS_FILE).append(tickers)
+    logger.debug(f"Saved {len(tickers)} tickers to progress file")
 
 def get_remaining_tickers(all_tickers, processed_tickers):
-    """Get list of tickers that haven't been processed yet"""
-    remaining = [ticker for ticker in all_tickers if ticker not in processed_tickers]
+    """Get list of tickers that haven't been processed yet, without duplicates"""
+    remaining = []
+    scheduled = set()
+    for ticker in all_tickers:
+        if ticker not in processed_tickers and ticker not in scheduled:
+            scheduled.add(ticker)
+            remaining.append(ticker)
     return remaining
 
-def send_tickers(ticker_batch):
-    """Send a batch of tickers to the API with YYZ command format"""
+def file_position(path):
+    """(inode, size) of `path`, or (None, 0) when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, 0
+    return stat.st_ino, stat.st_size
+
+def watch_tickers(path, known, stop, start=(None, 0)):
+    """Endless stream of tickers appended to `path` that are not in `known`, until `stop` is set.
+
+    `known` (processed and already scheduled tickers) stays in memory and is
+    updated as tickers are scheduled; only the bytes after the last read are
+    scanned, unless the file was replaced or truncated. The first read
+    starts at `start` (file_position() taken before the list was loaded).
+    """
+    from file_watcher import follow
+
+    position = {"inode": start[0], "offset": start[1]}
+
+    def read(hold_partial):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != position["inode"] or stat.st_size < position["offset"]:
+            position.update(inode=stat.st_ino, offset=0)
+        tickers = []
+        with open(path, 'rb') as f:
+            f.seek(position["offset"])
+            for line in f:
+                if not line.endswith(b"\n"):
+                    if hold_partial:
+                        break
+                else:
+                    position["offset"] += len(line)
+                ticker = line.decode("utf-8", errors="replace").strip().upper()
+                if ticker and ticker not in known:
+                    known.add(ticker)
+                    tickers.append(ticker)
+        if tickers:
+            logger.info(f"{len(tickers)} new tickers appended to {path}")
+        return tickers
+
+    return follow(path, read, stop, idle=get_journal(PROGRESS_FILE).commit)
+
+def chunk_tickers(tickers, size=MAX_TICKERS_PER_REQUEST):
+    """Group a ticker stream into requests of up to `size`; a partial group goes out when the stream is IDLE"""
+    from batch_engine import IDLE
+
+    chunk = []
+    for ticker in tickers:
+        if ticker is IDLE:
+            if chunk:
+                yield chunk
+                chunk = []
+            yield IDLE
+            continue
+        chunk.append(ticker)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_ticker_results(ticker_batch, body):
+    """Return the tickers of a multi-ticker request that the API accepted.
+
+    Responses that report per-ticker outcomes, either as a list of result
+    objects (``{"results": [{"ticker": "AAPL", "status": "success"}, ...]}``)
+    or as explicit ``failed`` / ``errors`` entries, are honoured. Tickers the
+    response does not mention are considered accepted, since the request
+    itself succeeded.
+    """
+    if not isinstance(body, dict):
+        return list(ticker_batch)
+
+    rejected = set()
+    for name in ("failed", "errors"):
+        entries = body.get(name) or []
+        if isinstance(entries, dict):
+            entries = list(entries)
+        for entry in entries:
+            if isinstance(entry, str):
+                rejected.add(entry.upper())
+            elif isinstance(entry, dict):
+                ticker = entry.get("ticker") or entry.get("input") or entry.get("symbol")
+                if ticker:
+                    rejected.add(str(ticker).upper())
+
+    for entry in body.get("results") or []:
+        if not isinstance(entry, dict):
+            continue
+        ticker = entry.get("ticker") or entry.get("input") or entry.get("symbol")
+        if not ticker:
+            continue
+        status = str(entry.get("status", "")).lower()
+        if entry.get("success") is False or entry.get("error") or status in ("error", "failed", "failure"):
+            rejected.add(str(ticker).upper())
+
+    return [ticker for ticker in ticker_batch if ticker not in rejected]
+
+def send_tickers(ticker_batch, archive=None, idempotency_key=None):
+    """Send up to MAX_TICKERS_PER_REQUEST tickers to the API in one YYZ call.
+
+    Rate-limit tokens are taken beforehand, by the engine's `admit` step
+    (http_client.admit). Stores every API response in `archive` (a
+    ResponseArchive) when given. `idempotency_key`
+    is sent with the request, so a resend the API already accepted does not
+    start a second job. Returns a SendResult whose `accepted` lists the
+    tickers the API took.
+    """
+    import requests
+    from retry_policy import parse_retry_after
+
     # Format: {"inputs": ["YYZ", "TICKER1", "TICKER2", "TICKER3"], "portfolio": "public"}
     payload = {
         "inputs": ["YYZ"] + ticker_batch,
         "portfolio": "public"
     }
+    headers = HEADERS if idempotency_key is None else {**HEADERS, http_client.IDEMPOTENCY_HEADER: idempotency_key}
     
-    print(f"[{datetime.now()}] TEST MODE: Would send payload: {payload}")
-    
-    # In test mode, simulate API call without actually sending
+    start = time.monotonic()
     try:
-        print(f"[{datetime.now()}] TEST MODE: Simulating API call to {API_URL}")
-        print(f"[{datetime.now()}] TEST MODE: Headers: {HEADERS}")
-        print(f"[{datetime.now()}] TEST MODE: Payload: {json.dumps(payload)}")
-        
-        # Simulate success for testing
-        print(f"[{datetime.now()}] TEST MODE: Simulated success response")
-        return True
+        response = http_client.post(
+            API_URL,
+            headers=headers,
+            data=json.dumps(payload),
+        )  # timeouts adapt to the endpoint's recent latency, see adaptive_timeout.py
+        latency = time.monotonic() - start
+        if archive is not None:
+            archive.add(ticker_batch, ticker_batch, response.status_code, response.text, latency)
         
-        # Uncomment below to make actual API calls
-        # response = requests.post(
-        #     API_URL,
-        #     headers=HEADERS,
-        #     data=json.dumps(payload),
-        #     timeout=30
-        # )
-        # 
-        # if response.status_code in [200, 201]:
-        #     print(f"[{datetime.now()}] Success: Tickers processed successfully")
-        #     print(f"Response: {response.json()}")
-        #     return True
-        # else:
-        #     print(f"[{datetime.now()}] Error: HTTP {response.status_code}")
-        #     print(f"Response: {response.text}")
-        #     return False
+        if response.status_code in [200, 201]:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            accepted = parse_ticker_results(ticker_batch, body)
+            logger.info(f"Success: {len(accepted)}/{len(ticker_batch)} tickers accepted")
+            logger.debug("API response", extra={"tickers": ticker_batch, "body": response.text,
+                                                "sample": structured_log.PAYLOAD_SAMPLE_RATE})
+            return SendResult(bool(accepted), response.status_code, latency, accepted=tuple(accepted))
+        else:
+            logger.warning(f"HTTP {response.status_code} from the API", extra={
+                "tickers": ticker_batch, "status": response.status_code, "body": response.text,
+            })
+            return SendResult(
+                False, response.status_code, latency, response.text[:500],
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
             
     except requests.exceptions.RequestException as e:
-        print(f"[{datetime.now()}] Request failed: {e}")
-        return False
+        logger.warning(f"Request failed: {e}", extra={"tickers": ticker_batch, "error_type": type(e).__name__})
+        return SendResult(
+            False, None, time.monotonic() - start, f"{type(e).__name__}: {e}",
+            error_type=type(e).__name__,
+            retry_after=getattr(e, "retry_after", None),  # set while the circuit breaker is open
+        )
+
+def process_tickers(tickers, rate_limiter, on_ticker_failed, archive=None, stop=None):
+    """Send tickers (any iterable, e.g. watch_tickers) in multi-ticker requests.
 
-def main():
-    wait_minutes = WAIT_TIME / 60
+    Starts with one request at a time; the in-flight limit then adapts up to
+    MAX_IN_FLIGHT while the API answers quickly and drops on 429/5xx.
+
+    Accepted tickers are saved to the progress file; every ticker that is
+    rejected or whose request exhausts its attempts is passed to
+    `on_ticker_failed(ticker, result, attempts)`. Once `stop` is set, only
+    the requests in flight are finished. Returns the number accepted.
+    """
+    from batch_engine import run_concurrent
+    from concurrency_control import AimdController
+    from retry_policy import RetryPolicy
+    
+    chunks = chunk_tickers(tickers)
+    total_successful = 0
+    # A request keeps its idempotency key only while its attempts get no answer (timeouts, connection errors)
+    idempotency_keys = {}  # tuple(chunk) -> idempotency key
     
-    print("Starting ticker processing service (TEST MODE)...")
+    def on_start(chunk):
+        logger.info(f"Sending request: {', '.join(chunk)}")
+
+    def on_success(chunk, result):
+        nonlocal total_successful
+        idempotency_keys.pop(tuple(chunk), None)
+        # Save only the tickers the API accepted
+        accepted = list(result.accepted or chunk)
+        save_processed_tickers(accepted)
+        total_successful += len(accepted)
+        for ticker in chunk:
+            if ticker not in accepted:
+                logger.warning(f"Ticker rejected by the API: {ticker}")
+                on_ticker_failed(ticker, SendResult(False, result.status, error="rejected by the API"), 1)
+        logger.info(f"Request complete: {len(accepted)}/{len(chunk)} tickers successful")
+
+    def on_retry(chunk, result, delay):
+        if result.status is not None:
+            idempotency_keys.pop(tuple(chunk), None)  # answered: the next attempt is a new request
+        logger.warning(f"Request failed - retrying in {delay:.0f}s", extra={
+            "tickers": chunk, "status": result.status, "error_type": result.error_type, "retry_in_s": round(delay, 1),
+        })
+
+    def on_failure(chunk, result, attempts):
+        idempotency_keys.pop(tuple(chunk), None)
+        logger.error("Request failed - will not be saved to progress file", extra={
+            "tickers": chunk, "status": getattr(result, "status", None), "attempts": attempts,
+        })
+        for ticker in chunk:
+            on_ticker_failed(ticker, result, attempts)
+
+    run_concurrent(
+        chunks,
+        lambda chunk: send_tickers(chunk, archive=archive,
+                                   idempotency_key=idempotency_keys.setdefault(tuple(chunk), uuid.uuid4().hex)),
+        on_success=on_success,
+        on_failure=on_failure,
+        on_start=on_start,
+        retry=RetryPolicy(max_attempts=MAX_ATTEMPTS, deadline=ITEM_DEADLINE),
+        on_retry=on_retry,
+        concurrency=AimdController(1, maximum=MAX_IN_FLIGHT),
+        # Wait out an open circuit breaker, then for API budget instead of sleeping a fixed interval
+        admit=lambda chunk: http_client.admit(API_URL, rate_limiter, stop),
+        stop=stop,
+    )
+    return total_successful
+
+def replay_dead_letters(dead_letters, archive=None):
+    """Resubmit only the tickers in the dead-letter store, with their own rate budget"""
+    records = dead_letters.load()
+    processed_tickers = load_processed_tickers()
+    failed = {ticker: record for ticker, record in records.items() if ticker not in processed_tickers}
+    logger.info(f"Replaying {len(failed)} failed tickers from {dead_letters.path}")
+    logger.info(f"Replay rate limit: {REPLAY_REQUESTS_PER_MINUTE} requests/minute (burst {REPLAY_BURST})")
+    
+    tickers = list(failed)
+    retried = {}
+
+    def on_ticker_failed(ticker, result, attempts):
+        retried[ticker] = dead_letters.make_record(ticker, result, attempts)
+
+    successful = 0
+    try:
+        if tickers:
+            successful = process_tickers(tickers, TokenBucket(REPLAY_REQUESTS_PER_MINUTE, REPLAY_BURST),
+                                         on_ticker_failed, archive)
+    finally:
+        # Keep every ticker that is still unprocessed, with its newest failure record
+        processed_tickers = load_processed_tickers()
+        still_failed = [retried.get(ticker, failed[ticker]) for ticker in tickers if ticker not in processed_tickers]
+        dead_letters.rewrite(still_failed)
+    logger.info(f"Replay complete: {successful} recovered, {len(still_failed)} still failing")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send listed-equity tickers to the research API (test mode)")
+    parser.add_argument("--replay-failed", action="store_true",
+                        help=f"resubmit only the tickers in {DEAD_LETTER_FILE} instead of reading {TICKERS_FILE}")
+    parser.add_argument("--watch", action="store_true",
+                        help=f"keep running and send tickers as they are appended to {TICKERS_FILE} "
+                             "(Ctrl-C or SIGTERM finishes the request in flight and exits)")
+    parser.add_argument("--transport", default=TRANSPORT,
+                        help=f"simulated[:k=v,...] (default: {TRANSPORT}), http to send for real, "
+                             "record:PATH or replay:PATH; see transport.py")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file",
+                        help=f"write Prometheus metrics to this file every {metrics.DUMP_INTERVAL:.0f}s and on exit")
+    parser.add_argument("--log-level", default=structured_log.LOG_LEVEL,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help=f"DEBUG adds a sample of API response bodies (default: {structured_log.LOG_LEVEL})")
+    parser.add_argument("--log-format", default=structured_log.LOG_FORMAT, choices=["json", "text"],
+                        help=f"JSON lines or human-readable text (default: {structured_log.LOG_FORMAT})")
+    args = parser.parse_args(argv)
+    try:
+        args.transport = transport.parse_transport(args.transport)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    structured_log.configure(args.log_level, args.log_format)
+    
+    from dead_letter import DeadLetterStore
+    from response_archive import ResponseArchive
+    
+    transport.set_transport(args.transport)
+    logger.info(f"Starting ticker processing service (TEST MODE, {type(args.transport).__name__})...")
+    
+    if args.metrics_port is not None:
+        metrics.start_http_server(args.metrics_port)
+    if args.metrics_file:
+        metrics.start_file_dump(args.metrics_file)
+    
+    dead_letters = DeadLetterStore(DEAD_LETTER_FILE)
+    archive = ResponseArchive(RESPONSE_ARCHIVE_DIR)
+    if args.replay_failed:
+        try:
+            replay_dead_letters(dead_letters, archive)
+        finally:
+            archive.close()
+        return
+    
+    # Load tickers from external file; --watch reads on from where this read started
+    watch_start = file_position(TICKERS_FILE)
+    tickers = load_tickers()
     
     # Load previously processed tickers
     processed_tickers = load_processed_tickers()
-    print(f"[{datetime.now()}] Loaded {len(processed_tickers)} previously processed tickers")
+    logger.info(f"Loaded {len(processed_tickers)} previously processed tickers")
     
-    # Get remaining tickers to process
-    remaining_tickers = get_remaining_tickers(TICKERS, processed_tickers)
+    # Get remaining tickers to process; dead-lettered ones wait for --replay-failed
+    dead_tickers = set(dead_letters.load()) - set(processed_tickers)
+    remaining_tickers = get_remaining_tickers(tickers, set(processed_tickers) | dead_tickers)
     
-    print(f"Total tickers in list: {len(TICKERS)}")
-    print(f"Already processed: {len(processed_tickers)}")
-    print(f"Remaining to process: {len(remaining_tickers)}")
-    print(f"Wait time between batches: {WAIT_TIME} seconds ({wait_minutes:.1f} minutes)")
-    print(f"Batch size: {BATCH_SIZE} tickers per batch")
+    logger.info(f"Total tickers in list: {len(tickers)}")
+    logger.info(f"Already processed: {len(processed_tickers)}")
+    logger.info(f"Remaining to process: {len(remaining_tickers)}")
+    logger.info(f"Left for --replay-failed: {len(dead_tickers)}")
+    logger.info(f"Rate limit: {REQUESTS_PER_MINUTE} requests/minute (burst {RATE_BURST})")
+    logger.info(f"Tickers per request: {MAX_TICKERS_PER_REQUEST}")
     
-    if not remaining_tickers:
-        print("All tickers have already been processed!")
+    if not remaining_tickers and not args.watch:
+        logger.info("All tickers have already been processed!")
+        archive.close()
         return
     
-    # Process remaining tickers in batches
-    for i in range(0, len(remaining_tickers), BATCH_SIZE):
-        batch = remaining_tickers[i:i+BATCH_SIZE]
-        batch_number = (i // BATCH_SIZE) + 1
-        total_batches = (len(remaining_tickers) + BATCH_SIZE - 1) // BATCH_SIZE  # Ceiling division
-        
-        print(f"\n[{datetime.now()}] Processing batch {batch_number}/{total_batches} ({len(batch)} tickers):")
-        for ticker in batch:
-            print(f"  - {ticker}")
-        
-        # Process each ticker in the batch individually
-        successful_tickers = []
-        for j, ticker in enumerate(batch):
-            print(f"[{datetime.now()}] Processing ticker {j+1}/{len(batch)} in batch: {ticker}")
-            success = send_tickers([ticker])  # Send as single-item list (plus YYZ command)
-            
-            if success:
-                successful_tickers.append(ticker)
-                print(f"[{datetime.now()}] Ticker processed successfully!")
-            else:
-                print(f"[{datetime.now()}] Ticker failed - will not be saved to progress file")
-        
-        # Save only the successfully processed tickers
-        if successful_tickers:
-            save_processed_tickers(successful_tickers)
-            print(f"[{datetime.now()}] Batch complete: {len(successful_tickers)}/{len(batch)} tickers successful")
-        else:
-            print(f"[{datetime.now()}] Batch complete: 0/{len(batch)} tickers successful")
-        
-        # Wait specified time unless it's the last batch
-        if i + BATCH_SIZE < len(remaining_tickers):
-            print(f"[{datetime.now()}] Waiting {wait_minutes:.1f} minutes before next batch...")
-            time.sleep(WAIT_TIME)
+    tickers_to_send = remaining_tickers
+    stop = None
+    if args.watch:
+        # The processed set stays in memory; appended tickers join the same run
+        from file_watcher import stop_on_signals
+        stop = stop_on_signals()
+        logger.info(f"Watching {TICKERS_FILE} for new tickers")
+        known = set(processed_tickers) | dead_tickers | set(remaining_tickers)
+        tickers_to_send = itertools.chain(remaining_tickers, watch_tickers(TICKERS_FILE, known, stop, watch_start))
+    
+    # Send remaining tickers in multi-ticker requests; failures go to the dead-letter store
+    try:
+        total_successful = process_tickers(tickers_to_send, RATE_LIMITER, dead_letters.add, archive, stop)
+    finally:
+        archive.close()
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
     
-    print(f"\n[{datetime.now()}] All remaining batches processed!")
+    if args.watch:
+        logger.info(f"Stopped watching {TICKERS_FILE}: {total_successful} tickers successful")
+    else:
+        logger.info(f"All remaining tickers processed: {total_successful}/{len(remaining_tickers)} successful")
+    logger.info(metrics.summary())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,154 @@
+# Watching input files for appended lines (--watch)
+#
+# InotifyWatcher asks the Linux kernel (inotify, through ctypes) for changes
+# to the file's directory, so appends, rewrites and editors that replace the
+# file by rename are all noticed without polling. Elsewhere, or when inotify
+# is unavailable, PollingWatcher compares the file's inode, size and mtime
+# every POLL_INTERVAL seconds. Both only answer "has it changed since the last
+# call?" without blocking, so they can be asked from the engine's event loop.
+#
+# follow() turns a watcher into an endless item stream for
+# batch_engine.run_concurrent, yielding batch_engine.IDLE while there is
+# nothing new.
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import signal
+import struct
+import threading
+import time
+
+from batch_engine import IDLE
+
+POLL_INTERVAL = 1.0  # seconds between stat() calls of the polling fallback
+SETTLE_SECONDS = 2.0  # quiet time after which an unterminated last line is taken as complete
+
+# inotify(7) constants
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+logger = logging.getLogger(__name__)
+
+class InotifyWatcher:
+    """Changes to `path` reported by inotify on its directory"""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.name = os.fsencode(os.path.basename(path))
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        directory = os.path.dirname(os.path.abspath(path))
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def changed(self):
+        """True if the file was touched since the last call; never blocks"""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                if data[offset:offset + length].rstrip(b"\0") == self.name:
+                    changed = True
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Changes to `path` noticed by comparing its stat() every `interval` seconds"""
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.last_check = time.monotonic()
+        self.signature = self._signature()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def changed(self):
+        """True if the file looked different at the last check; never blocks"""
+        if time.monotonic() - self.last_check < self.interval:
+            return False
+        self.last_check = time.monotonic()
+        signature = self._signature()
+        changed, self.signature = signature != self.signature, signature
+        return changed
+
+    def close(self):
+        pass
+
+def open_watcher(path, poll_interval=POLL_INTERVAL):
+    """An InotifyWatcher for `path`, or a PollingWatcher where inotify is not available"""
+    try:
+        return InotifyWatcher(path)
+    except (OSError, AttributeError) as e:  # AttributeError: libc without inotify (not Linux)
+        logger.info(f"inotify unavailable ({e}); polling {path} every {poll_interval}s")
+        return PollingWatcher(path, poll_interval)
+
+def follow(path, read, stop, idle=None, poll_interval=POLL_INTERVAL, settle=SETTLE_SECONDS):
+    """Yield the items `read(hold_partial)` finds each time `path` changes, until `stop` is set.
+
+    `read(True)` is called once up front, for lines appended before the
+    watcher was opened (e.g. while a backlog was being sent), so `read`
+    should resume where the previous read stopped. After a change,
+    `read(True)` should leave out an unterminated last line (it may still
+    be being written); once the file has been quiet for `settle` seconds,
+    `read(False)` is called once more to pick it up. In between, IDLE is
+    yielded so the engine can wait without blocking, and `idle()` runs,
+    e.g. to commit buffered progress.
+    """
+    watcher = open_watcher(path, poll_interval)
+    last_change = time.monotonic()
+    try:
+        yield from read(True)
+        while not stop.is_set():
+            if watcher.changed():
+                last_change = time.monotonic()
+                yield from read(True)
+            elif last_change is not None and time.monotonic() - last_change >= settle:
+                last_change = None
+                yield from read(False)
+            else:
+                if idle:
+                    idle()
+                yield IDLE
+    finally:
+        watcher.close()
+
+def stop_on_signals():
+    """Event set by the first SIGINT/SIGTERM, for a graceful end of --watch; a second SIGINT aborts"""
+    stop = threading.Event()
+
+    def handle(signum, frame):
+        if stop.is_set() and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        logger.info(f"Received {signal.Signals(signum).name}; finishing requests in flight")
+        stop.set()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+    return stop
@@ -0,0 +1,194 @@
+# Shared HTTP client for the research API
+#
+# All processors send through one pooled requests.Session so that DNS lookup,
+# TCP connect and TLS handshake are paid once per connection instead of once
+# per company. requests is imported on first use so that importing a
+# processor stays cheap. The request itself goes through the current
+# transport (transport.py), so the same path can be simulated or replayed.
+
+import contextlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import metrics
+import transport
+
+POOL_CONNECTIONS = 4  # number of hosts to keep a connection pool for
+POOL_MAXSIZE = 8  # connections kept alive per host
+POOL_BLOCK = True  # wait for a free connection instead of opening more than POOL_MAXSIZE per host
+KEEP_WARM_INTERVAL = 30  # seconds of idleness before the keep-warm thread touches the API
+IDEMPOTENCY_HEADER = "Idempotency-Key"  # lets the API recognise a resent request and answer it without a new job
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class SendResult:
+    """Outcome of one API call; truthy when the API accepted the request"""
+    ok: bool
+    status: int = None  # HTTP status, None when no response was received
+    latency: float = None  # seconds spent waiting for the API
+    error: str = None
+    error_type: str = None  # exception class name when the request raised
+    retry_after: float = None  # seconds requested by a Retry-After header
+    accepted: tuple = None  # items the API reported as accepted, for multi-item payloads
+
+    def __bool__(self):
+        return self.ok
+
+_session = None
+_session_lock = threading.Lock()
+_deadline = threading.local()  # per worker thread: monotonic time the current item must finish by
+_last_activity = time.monotonic()
+_keep_warm_thread = None
+
+def _build_session(pool_connections, pool_maxsize, pool_block):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def configure(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=POOL_BLOCK):
+    """Replace the shared session with one using the given pool settings"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = _build_session(pool_connections, pool_maxsize, pool_block)
+        return _session
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _build_session(POOL_CONNECTIONS, POOL_MAXSIZE, POOL_BLOCK)
+        return _session
+
+@contextlib.contextmanager
+def deadline(at):
+    """Make post() on this thread finish by monotonic time `at` (None: no deadline)"""
+    previous = getattr(_deadline, "at", None)
+    _deadline.at = at
+    try:
+        yield
+    finally:
+        _deadline.at = previous
+
+def admit(url, rate_limiter, stop=None):
+    """Wait until a call to `url` may be sent; returns None.
+
+    Waits while the host's circuit breaker is refusing requests, then for a
+    token from `rate_limiter`, so no token is spent on a call the breaker
+    would refuse and a short outage costs waiting time, not attempts. A
+    token taken while the breaker opened again is kept for the next try.
+    Returns early once `stop` (a threading.Event) is set.
+    """
+    from circuit_breaker import get_breaker
+
+    breaker = get_breaker(url)
+    have_token = False
+    while breaker.wait_until_allowed(stop):
+        if not have_token:
+            if rate_limiter.acquire(stop=stop) is None:
+                return None
+            have_token = True
+        if not breaker.refusing():
+            return None
+    return None
+
+def post(url, **kwargs):
+    """POST through the shared session (same arguments as requests.post).
+
+    Without a `timeout`, connect and read timeouts come from
+    adaptive_timeout (derived from the endpoint's recent latency), cut to
+    what is left of the deadline() in force; once nothing is left this
+    raises a DeadlineExceeded (a requests Timeout) without sending.
+
+    Goes through the host's circuit breaker: while it is open this raises
+    circuit_breaker.CircuitOpenError (a requests ConnectionError) without
+    touching the network. 5xx responses and transport errors count as
+    failures; any other response counts as the API being up.
+    """
+    import requests
+    import adaptive_timeout
+    from circuit_breaker import CircuitOpenError, get_breaker
+
+    global _last_activity
+    endpoint = urlsplit(url).path or "/"
+    censored = None  # read timeout to record as a latency if it fires
+    if "timeout" not in kwargs:
+        connect, read = adaptive_timeout.timeouts(endpoint)
+        censored = read
+        at = getattr(_deadline, "at", None)
+        if at is not None:
+            remaining = at - time.monotonic()
+            if remaining <= 0:
+                raise adaptive_timeout.DeadlineExceeded(
+                    f"deadline for this item passed {-remaining:.1f}s ago; not sending")
+            if remaining < read:
+                censored = None  # cut short by the deadline, says nothing about the API
+            connect, read = min(connect, remaining), min(read, remaining)
+        kwargs["timeout"] = (connect, read)
+    breaker = get_breaker(url)
+    permit = breaker.allow_request()
+    if permit is None:
+        metrics.inc("batcher_api_requests_total", endpoint=endpoint, status_class="circuit_open")
+        raise CircuitOpenError(f"circuit breaker for {breaker.name} is open", retry_after=breaker.retry_after())
+
+    start = _last_activity = time.monotonic()
+    try:
+        response = transport.get_transport().post(url, **kwargs)
+    except Exception as e:
+        breaker.record(False, permit)  # always record, or a half-open probe would never finish
+        _record(endpoint, "error", start)
+        if censored is not None and isinstance(e, requests.exceptions.ReadTimeout):
+            adaptive_timeout.observe(endpoint, censored)  # at least this slow; lets the timeout grow
+        raise
+    finally:
+        _last_activity = time.monotonic()
+    breaker.record(response.status_code < 500, permit)
+    _record(endpoint, metrics.status_class(response.status_code), start)
+    adaptive_timeout.observe(endpoint, _last_activity - start)
+    return response
+
+def _record(endpoint, status_class, start):
+    metrics.inc("batcher_api_requests_total", endpoint=endpoint, status_class=status_class)
+    metrics.observe("batcher_api_request_seconds", _last_activity - start, endpoint=endpoint, status_class=status_class)
+
+def _keep_warm_loop(url, interval):
+    import requests
+
+    global _last_activity
+    while True:
+        time.sleep(interval / 2)
+        if time.monotonic() - _last_activity < interval:
+            continue
+        # Any response keeps the pooled connection alive; the status is irrelevant
+        try:
+            transport.get_transport().head(url, timeout=10)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Keep-warm request failed: {e}")
+        _last_activity = time.monotonic()
+
+def start_keep_warm(url, interval=KEEP_WARM_INTERVAL):
+    """Touch `url` whenever the client has been idle for `interval` seconds.
+
+    Runs on a daemon thread so pooled connections survive long rate-limit
+    waits and the next real request skips the handshake.
+    """
+    global _keep_warm_thread
+    if _keep_warm_thread is not None:
+        return
+    _keep_warm_thread = threading.Thread(target=_keep_warm_loop, args=(url, interval), daemon=True)
+    _keep_warm_thread.start()
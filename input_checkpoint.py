@@ -0,0 +1,55 @@
+# Checkpoint of how much of an input file has been scheduled
+#
+# Stored in the work ledger's meta table: the file's inode, the byte offset
+# up to which every line has been enqueued, and a hash of its first bytes.
+# On restart only the bytes after that offset are scanned. If the file was
+# replaced, truncated or edited at the start, the whole file is scanned again
+# (enqueueing is idempotent, so a rescan only costs time).
+
+import hashlib
+import json
+import os
+
+PREFIX_HASH_BYTES = 64 * 1024  # leading bytes hashed to detect a file rewritten in place
+
+def prefix_hash(path, length):
+    """Hash of the first `length` bytes of `path`"""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(length), digest_size=16).hexdigest()
+
+class InputCheckpoint:
+    """Where to resume scanning `path`, and the offset reached by the current scan"""
+
+    def __init__(self, ledger, path):
+        self.ledger = ledger
+        self.path = path
+        self.meta_name = f"input:{os.path.abspath(path)}"
+        self.start = self._resume_offset()
+        self.offset = self.start  # end of the last complete line read so far
+
+    def _resume_offset(self):
+        saved = self.ledger.get_meta(self.meta_name)
+        if not saved or not os.path.exists(self.path):
+            return 0
+        saved = json.loads(saved)
+        stat = os.stat(self.path)
+        if stat.st_ino != saved["inode"] or stat.st_size < saved["offset"]:
+            return 0
+        if prefix_hash(self.path, min(saved["offset"], PREFIX_HASH_BYTES)) != saved["prefix_hash"]:
+            return 0
+        return saved["offset"]
+
+    def advance(self, raw_line):
+        """Account for one line read from the file (bytes, as read)"""
+        if raw_line.endswith(b"\n"):
+            self.offset += len(raw_line)
+
+    def save(self):
+        """Record that everything up to `offset` has been scheduled"""
+        if not os.path.exists(self.path):
+            return
+        self.ledger.set_meta(self.meta_name, json.dumps({
+            "inode": os.stat(self.path).st_ino,
+            "offset": self.offset,
+            "prefix_hash": prefix_hash(self.path, min(self.offset, PREFIX_HASH_BYTES)),
+        }))
@@ -0,0 +1,178 @@
+# On-disk membership index for processed items
+#
+# A sorted array of 64-bit hashes of canonical keys, memory-mapped and binary
+# searched, so checking "already processed?" costs a few page reads instead
+# of holding every key of the progress file in a Python set. The index
+# remembers which file (inode) and how many bytes of it it covers; lines
+# appended since are hashed into a small in-memory tail, and the index is
+# rebuilt once that tail grows past REBUILD_FRACTION of the indexed items.
+#
+# Two distinct keys share a 64-bit hash with probability ~n²/2⁶⁵ (about 3e-6
+# at ten million items); such a collision would skip one unprocessed item.
+
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b"BTCHIDX1"
+HEADER = struct.Struct("<8sQQQQ")  # magic, hash count, entries, source inode, source offset
+HASH = struct.Struct("<Q")
+
+BUILD_CHUNK = 1_000_000  # hashes sorted in memory at a time while building
+REBUILD_FRACTION = 0.1  # rebuild once the unindexed tail exceeds this share of the index
+REBUILD_MIN = 10_000  # ...and has at least this many items
+
+def key_hash(key):
+    """64-bit hash of a canonical key"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+def iter_keys(path, key_fn, offset=0):
+    """Yield (key, end offset) for every complete line of `path` from `offset` on"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                return  # torn last line; the journal repairs it on open
+            offset += len(raw)
+            key = key_fn(raw.decode("utf-8", errors="replace"))
+            yield key, offset
+
+def _write_hashes(f, hashes):
+    data = array("Q", hashes)
+    if sys.byteorder == "big":
+        data.byteswap()
+    data.tofile(f)
+
+def _read_run(f, block=64 * 1024):
+    """Yield the hashes of a sorted run file"""
+    f.seek(0)
+    while True:
+        data = array("Q")
+        data.frombytes(f.read(block * HASH.size))
+        if not data:
+            return
+        if sys.byteorder == "big":
+            data.byteswap()
+        yield from data
+
+def build_index(source, index_path, key_fn, chunk_size=BUILD_CHUNK):
+    """Write a sorted, deduplicated hash index of `source`; memory is bounded by `chunk_size`"""
+    entries = 0
+    offset = 0
+    inode = 0
+    runs = []
+    chunk = array("Q")
+    try:
+        if os.path.exists(source):
+            inode = os.stat(source).st_ino
+            for key, offset in iter_keys(source, key_fn):
+                if not key:
+                    continue
+                entries += 1
+                chunk.append(key_hash(key))
+                if len(chunk) >= chunk_size:
+                    runs.append(tempfile.TemporaryFile())
+                    _write_hashes(runs[-1], sorted(chunk))
+                    chunk = array("Q")
+        merged = heapq.merge(*(_read_run(run) for run in runs), sorted(chunk))
+
+        tmp_path = f"{index_path}.tmp"
+        count = 0
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, 0, 0, 0, 0))
+            block = array("Q")
+            last = None
+            for value in merged:
+                if value == last:
+                    continue
+                last = value
+                block.append(value)
+                if len(block) >= 64 * 1024:
+                    _write_hashes(out, block)
+                    count += len(block)
+                    block = array("Q")
+            _write_hashes(out, block)
+            count += len(block)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, count, entries, inode, offset))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, index_path)
+    finally:
+        for run in runs:
+            run.close()
+
+class MembershipIndex:
+    """Read-only view of an index file plus the keys added since it was built"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.entries, self.inode, self.offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a membership index")
+        self.tail = set()  # hashes of keys not in the mapped array
+
+    def __len__(self):
+        return self.count + len(self.tail)
+
+    def __contains__(self, key):
+        value = key_hash(key)
+        return value in self.tail or self._search(value)
+
+    def _search(self, value):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found = HASH.unpack_from(self.map, HEADER.size + mid * HASH.size)[0]
+            if found < value:
+                lo = mid + 1
+            elif found > value:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def add(self, key):
+        """Record `key` as a member (kept in memory until the next rebuild)"""
+        value = key_hash(key)
+        if not self._search(value):
+            self.tail.add(value)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+def open_index(source, key_fn, index_path=None):
+    """Return an up-to-date MembershipIndex for the progress file `source`.
+
+    The index at `index_path` (default `<source>.idx`) is reused when it was
+    built from the same file; lines appended since are read into its tail.
+    It is rebuilt when missing, stale or when the tail has grown too large.
+    """
+    index_path = index_path or f"{source}.idx"
+    stat = os.stat(source) if os.path.exists(source) else None
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = MembershipIndex(index_path)
+        except (ValueError, struct.error):
+            index = None  # unreadable or partially written; rebuild it
+    if index is not None and stat and index.inode == stat.st_ino and index.offset <= stat.st_size:
+        for key, offset in iter_keys(source, key_fn, index.offset):
+            if key:
+                index.entries += 1
+                index.add(key)
+        if len(index.tail) < max(REBUILD_MIN, REBUILD_FRACTION * index.count):
+            return index
+    if index is not None:
+        index.close()
+    build_index(source, index_path, key_fn)
+    return MembershipIndex(index_path)
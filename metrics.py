@@ -0,0 +1,191 @@
+# In-process metrics for the batch processors
+#
+# Counters, gauges and latency histograms keyed by name and labels, rendered
+# in the Prometheus text format. Expose them on a local port with
+# start_http_server(port) (scrape http://127.0.0.1:<port>/metrics) or write
+# them to a file every few seconds with start_file_dump(path), e.g. for the
+# node_exporter textfile collector. Recording is a dict update under a lock.
+
+import logging
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # seconds
+DUMP_INTERVAL = 15.0  # seconds between metric file dumps
+
+logger = logging.getLogger(__name__)
+
+HELP = {
+    "batcher_api_requests_total": ("counter", "API calls by endpoint and status class (2xx, 4xx, 5xx, error, circuit_open)"),
+    "batcher_api_request_seconds": ("histogram", "API call latency by endpoint and status class"),
+    "batcher_items_total": ("counter", "Items finished by the engine, by outcome (success, retry, failure)"),
+    "batcher_engine_items": ("gauge", "Items in the engine by state (in_flight, waiting_retry)"),
+    "batcher_read_timeout_seconds": ("gauge", "Read timeout currently used per endpoint (adaptive_timeout)"),
+    "batcher_concurrency_limit": ("gauge", "Requests the adaptive controller currently allows in flight"),
+    "batcher_rate_limit_wait_seconds_total": ("counter", "Seconds spent waiting for API budget"),
+    "batcher_circuit_state": ("gauge", "Circuit breaker state per host (0 closed, 1 half-open, 2 open)"),
+    "batcher_circuit_transitions_total": ("counter", "Circuit breaker state changes per host and new state"),
+}
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+def inc(name, value=1, **labels):
+    """Add `value` to a counter"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def set_gauge(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+def observe(name, value, **labels):
+    """Record one observation (in seconds) in a latency histogram"""
+    key = _key(name, labels)
+    with _lock:
+        counts = _histograms.get(key)
+        if counts is None:
+            counts = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[len(LATENCY_BUCKETS)] += 1
+        counts[-1] += value
+
+def status_class(status=None, error_type=None):
+    """Label for an API outcome: "2xx" ... "5xx", "circuit_open" or "error" when no response came back"""
+    if status is not None:
+        return f"{status // 100}xx"
+    return "circuit_open" if error_type == "CircuitOpenError" else "error"
+
+def quantile(name, q, **labels):
+    """Estimate the q-quantile of a histogram from its buckets (upper bound of the bucket), or None.
+
+    Without labels, all series of the histogram are combined.
+    """
+    with _lock:
+        if labels:
+            series = [_histograms.get(_key(name, labels))]
+        else:
+            series = [counts for (series_name, _), counts in _histograms.items() if series_name == name]
+        series = [counts for counts in series if counts]
+        if not series:
+            return None
+        counts = [sum(values) for values in zip(*(buckets[:-1] for buckets in series))]
+    total = sum(counts)
+    if not total:
+        return None
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), counts):
+        seen += count
+        if seen >= q * total:
+            return bound
+    return float("inf")
+
+def summary():
+    """One-line summary of API calls and latency for the end-of-run report"""
+    with _lock:
+        calls = {}
+        for (name, labels), value in _counters.items():
+            if name == "batcher_api_requests_total":
+                status = dict(labels)["status_class"]
+                calls[status] = calls.get(status, 0) + value
+    if not calls:
+        return "no API calls"
+    text = ", ".join(f"{status} {count}" for status, count in sorted(calls.items()))
+    p50 = quantile("batcher_api_request_seconds", 0.5)
+    p99 = quantile("batcher_api_request_seconds", 0.99)
+    if p50 is not None:
+        text += f"; latency p50 <= {p50}s, p99 <= {p99}s"
+    return f"API calls: {text}"
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((key, list(counts)) for key, counts in _histograms.items())
+
+    lines = []
+    described = set()
+
+    def describe(name):
+        if name not in described and name in HELP:
+            kind, text = HELP[name]
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+        described.add(name)
+
+    for (name, labels), value in counters + gauges:
+        describe(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), counts in histograms:
+        describe(name)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), counts[:-1]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {counts[-1]}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve render() at http://host:port/metrics on a daemon thread; returns the server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes would drown out the processor's own output
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+def dump(path):
+    """Atomically write render() to `path`"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+def _dump_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            dump(path)
+        except OSError as e:
+            logger.warning(f"Writing metrics to {path} failed: {e}")
+
+def start_file_dump(path, interval=DUMP_INTERVAL):
+    """Write the metrics to `path` every `interval` seconds on a daemon thread"""
+    threading.Thread(target=_dump_loop, args=(path, interval), daemon=True).start()
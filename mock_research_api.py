@@ -0,0 +1,102 @@
+# Local stand-in for the research API, used by the benchmark scripts
+#
+# Serves both endpoints the processors call:
+#   POST /api/v1/research/        {"urls": [...]}               -> 201 {"status": "queued", ...}
+#   POST /api/v2/public-company/  {"inputs": ["YYZ", ...], ...} -> 201 with per-ticker "results"
+# Answers come from transport.SimulatedTransport, the same model the
+# processors can use in-process with --transport simulated: latency drawn
+# from a configurable distribution, and a share of requests answered with
+# 5xx errors or 429 throttling (with Retry-After). A request repeating the
+# Idempotency-Key of an accepted one gets the original answer back.
+#
+#     python mock_research_api.py --latency 0.2 --distribution lognormal --error-rate 0.02
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from transport import DISTRIBUTIONS, SimulatedTransport
+
+class MockResearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        idempotency_key = self.headers.get("Idempotency-Key")
+        status, body, headers, latency = self.server.transport.respond(self.path, payload, idempotency_key)
+        time.sleep(latency)
+        if isinstance(status, str):
+            self.close_connection = True  # a simulated network failure: hang up without answering
+            return
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockResearchServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    @property
+    def request_count(self):
+        return self.transport.request_count
+
+    @property
+    def status_counts(self):
+        return self.transport.status_counts
+
+def start_mock_server(latency=0.2, host="127.0.0.1", port=0, ssl_context=None, **simulation):
+    """Start the mock API on a background thread; returns (server, base_url)
+
+    `latency` and `simulation` configure the transport.SimulatedTransport
+    that decides every answer (distribution, error_rate, throttle_rate,
+    retry_after, reject_rate, requests_per_second, schedule, seed). Pass an
+    ``ssl.SSLContext`` to serve HTTPS instead of plain HTTP.
+    """
+    server = MockResearchServer((host, port), MockResearchHandler)
+    server.transport = SimulatedTransport(latency=latency, **simulation)
+    scheme = "http"
+    if ssl_context is not None:
+        server.socket = ssl_context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://{host}:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the research API")
+    parser.add_argument("--port", type=int, default=8090, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.2, help="mean response time in seconds")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="share of tickers reported as failed")
+    parser.add_argument("--requests-per-second", type=int, help="answer requests beyond this rate with 429")
+    args = parser.parse_args(argv)
+
+    server, base_url = start_mock_server(
+        latency=args.latency, port=args.port, distribution=args.distribution, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, retry_after=args.retry_after, reject_rate=args.reject_rate,
+        requests_per_second=args.requests_per_second,
+    )
+    print(f"[{datetime.now()}] Mock research API listening on {base_url}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
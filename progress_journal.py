@@ -0,0 +1,152 @@
+# Crash-safe append-only progress journal
+#
+# Keeps the progress file open and group-commits appended lines: records are
+# buffered and written + fsynced once COMMIT_EVERY lines are waiting or
+# COMMIT_INTERVAL seconds have passed. On open, a torn last line left by a
+# crash mid-write is cut off, so the next record never merges into it.
+#
+# An open journal holds a shared flock on its file. Compaction replaces the
+# file by rename and would strand the appends of a process still holding the
+# old one, so it needs the exclusive lock (exclusive()) and is skipped while
+# any other process has the file open as a journal.
+
+import atexit
+import contextlib
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: no advisory locks
+    fcntl = None
+
+COMMIT_EVERY = 20  # buffered lines per fsync
+COMMIT_INTERVAL = 1.0  # seconds before buffered lines are committed regardless of count
+REPAIR_CHUNK = 64 * 1024  # bytes read backwards at a time when looking for the last newline
+
+logger = logging.getLogger(__name__)
+
+def repair_tail(path):
+    """Truncate `path` after its last newline; returns the number of bytes dropped"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - REPAIR_CHUNK)
+            f.seek(start)
+            chunk = f.read(end - start)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+        return size - end
+
+def _open_shared(path):
+    """Open `path` for appending under a shared lock, reopening if it was replaced while we waited"""
+    while True:
+        f = open(path, 'a')
+        if fcntl is None:
+            return f
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+        try:
+            if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+@contextlib.contextmanager
+def exclusive(path):
+    """Hold `path` exclusively, e.g. to rewrite it.
+
+    Raises BlockingIOError at once while a journal in another process has
+    it open; close this process's own journal for `path` first.
+    """
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        yield
+
+class ProgressJournal:
+    """One line per processed item, durable once commit() has run"""
+
+    def __init__(self, path, commit_every=COMMIT_EVERY, commit_interval=COMMIT_INTERVAL):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        dropped = repair_tail(path)
+        if dropped:
+            logger.warning(f"Dropped a torn {dropped}-byte line at the end of {path}")
+        self.file = _open_shared(path)
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+        self.lock = threading.Lock()
+
+    def append(self, items):
+        """Add one line per item; commits when the size or time trigger fires"""
+        with self.lock:
+            for item in items:
+                self.file.write(f"{item}\n")
+                self.uncommitted += 1
+            if (self.uncommitted >= self.commit_every
+                    or time.monotonic() - self.last_commit >= self.commit_interval):
+                self._commit()
+
+    def flush(self):
+        """Hand buffered lines to the OS so readers of the file see them (no fsync)"""
+        with self.lock:
+            self.file.flush()
+
+    def commit(self):
+        """Write and fsync everything appended so far"""
+        with self.lock:
+            self._commit()
+
+    def _commit(self):
+        if self.uncommitted:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.uncommitted = 0
+        self.last_commit = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._commit()
+                self.file.close()
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def get_journal(path):
+    """Return the shared journal for `path`, opening (and repairing) it on first use"""
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = ProgressJournal(path)
+        return _journals[path]
+
+def close_journal(path):
+    """Commit and close the journal for `path`, if open; the next get_journal() reopens it"""
+    with _journals_lock:
+        journal = _journals.pop(path, None)
+    if journal:
+        journal.close()
+
+def close_journals():
+    """Commit and close every open journal"""
+    with _journals_lock:
+        journals = list(_journals.values())
+        _journals.clear()
+    for journal in journals:
+        journal.close()
+
+atexit.register(close_journals)
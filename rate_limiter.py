@@ -0,0 +1,61 @@
+# Token-bucket rate limiter shared by the batch processors
+
+import threading
+import time
+
+import metrics
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Tokens refill continuously at `requests_per_minute` up to `burst`, so
+    callers can spend saved-up budget immediately and otherwise wait only
+    as long as it takes for the next token to arrive.
+    """
+
+    def __init__(self, requests_per_minute, burst=1):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.rate = requests_per_minute / 60.0  # tokens per second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available right now; never blocks"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, stop=None):
+        """Block until tokens are available, take them and return the seconds waited.
+
+        With `stop` (a threading.Event), gives up as soon as it is set and returns None.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    if now > start:
+                        metrics.inc("batcher_rate_limit_wait_seconds_total", now - start)
+                    return now - start
+                wait = (tokens - self.tokens) / self.rate
+            if stop is None:
+                time.sleep(wait)
+            elif stop.wait(wait):
+                return None
@@ -0,0 +1,170 @@
+# Compressed archive of research API responses
+#
+# Every response is appended as a JSON record to gzip segment files in
+# ARCHIVE_DIR (archive-00001.jsonl.gz, ...); a new segment is started once
+# the current one passes SEGMENT_MAX_BYTES. Records are written in small
+# gzip members, so each segment is an ordinary .jsonl.gz that zcat or
+# gzip.open() read end to end, while a lookup only inflates one member.
+# A SQLite index maps each item key to the member holding its records.
+#
+#     python response_archive.py example.com            # last response for a company
+#     python response_archive.py --key ticker AAPL MSFT
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+ARCHIVE_DIR = "responses"
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024  # compressed size at which a new segment is started
+MEMBER_RECORDS = 100  # records compressed together; a lookup inflates at most this many
+MEMBER_INTERVAL = 5.0  # seconds before buffered records are written regardless of count
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_key ON responses (key, ts);
+"""
+
+logger = logging.getLogger(__name__)
+
+def segment_path(directory, segment):
+    return os.path.join(directory, f"archive-{segment:05d}.jsonl.gz")
+
+class ResponseArchive:
+    """Append-only store of API responses with a per-key index"""
+
+    def __init__(self, directory=ARCHIVE_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 member_records=MEMBER_RECORDS, member_interval=MEMBER_INTERVAL):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.member_records = member_records
+        self.member_interval = member_interval
+        os.makedirs(directory, exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self.index.execute("PRAGMA journal_mode=WAL")
+        self.index.executescript(INDEX_SCHEMA)
+        self.buffer = []  # records waiting to be written
+        self.last_write = time.monotonic()
+        self.lock = threading.Lock()
+        self.segment = self._repair()
+
+    def _repair(self):
+        """Cut anything after the last indexed member of the newest segment; returns its number"""
+        segment, end = self.index.execute(
+            "SELECT segment, MAX(offset + length) FROM responses "
+            "WHERE segment = (SELECT MAX(segment) FROM responses)"
+        ).fetchone()
+        if segment is None:
+            # Empty index: never append to segments it doesn't describe
+            numbers = [int(name[8:13]) for name in os.listdir(self.directory)
+                       if name.startswith("archive-") and name.endswith(".jsonl.gz")]
+            return max(numbers, default=0) + 1
+        path = segment_path(self.directory, segment)
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            logger.warning(f"Dropping {os.path.getsize(path) - end} unindexed bytes at the end of {path}")
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        return segment
+
+    def add(self, keys, item, status, body, latency=None):
+        """Archive one response for the item(s) `keys`; `body` is parsed as JSON when possible"""
+        try:
+            body = json.loads(body)
+        except (TypeError, ValueError):
+            pass
+        record = {
+            "keys": list(keys),
+            "item": item,
+            "ts": time.time(),
+            "status": status,
+            "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            "body": body,
+        }
+        with self.lock:
+            self.buffer.append(record)
+            if (len(self.buffer) >= self.member_records
+                    or time.monotonic() - self.last_write >= self.member_interval):
+                self._write()
+
+    def _write(self):
+        self.last_write = time.monotonic()
+        if not self.buffer:
+            return
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in self.buffer)
+        member = gzip.compress(lines.encode("utf-8"))
+        path = segment_path(self.directory, self.segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(member) > self.segment_max_bytes:
+            self.segment += 1
+            path = segment_path(self.directory, self.segment)
+        with open(path, "ab") as f:
+            offset = f.tell()
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+        rows = [(key, record["ts"], self.segment, offset, len(member), line)
+                for line, record in enumerate(self.buffer) for key in record["keys"]]
+        with self.index:
+            self.index.executemany(
+                "INSERT INTO responses (key, ts, segment, offset, length, line) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.buffer = []
+
+    def flush(self):
+        with self.lock:
+            self._write()
+
+    def latest(self, key):
+        """The most recent record archived for `key`, or None"""
+        self.flush()
+        row = self.index.execute(
+            "SELECT segment, offset, length, line FROM responses WHERE key = ? ORDER BY ts DESC LIMIT 1", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length, line = row
+        with open(segment_path(self.directory, segment), "rb") as f:
+            f.seek(offset)
+            lines = gzip.decompress(f.read(length)).decode("utf-8").splitlines()
+        return json.loads(lines[line])
+
+    def close(self):
+        with self.lock:
+            self._write()
+            self.index.close()
+
+def main(argv=None):
+    from compact_progress import KEY_FUNCTIONS
+
+    parser = argparse.ArgumentParser(description="Print the last archived API response for items")
+    parser.add_argument("items", nargs="+", help="URLs or tickers to look up")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help=f"archive directory (default: {ARCHIVE_DIR})")
+    parser.add_argument("--key", choices=sorted(KEY_FUNCTIONS), default="url",
+                        help="how items are canonicalized (default: url)")
+    args = parser.parse_args(argv)
+
+    archive = ResponseArchive(args.dir)
+    try:
+        for item in args.items:
+            record = archive.latest(KEY_FUNCTIONS[args.key](item))
+            if record is None:
+                print(f"{item}: no archived response")
+            else:
+                when = datetime.fromtimestamp(record["ts"])
+                print(f"{item}: HTTP {record['status']} at {when}")
+                print(json.dumps(record["body"], indent=2))
+    finally:
+        archive.close()
+
+if __name__ == "__main__":
+    main()
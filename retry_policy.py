@@ -0,0 +1,112 @@
+# Retry classification, backoff and the delayed retry queue used by batch_engine
+
+import heapq
+import itertools
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+MAX_ATTEMPTS = 5  # total attempts per item, including the first
+BASE_DELAY = 2.0  # seconds; backoff ceiling for the first retry
+MAX_DELAY = 300.0  # seconds; backoff never exceeds this (Retry-After may)
+
+RETRYABLE_STATUSES = {408, 425, 429}  # plus every 5xx
+RETRYABLE_ERROR_TYPES = {  # requests / urllib3 exception names worth another try
+    "Timeout",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "ConnectionError",
+    "ChunkedEncodingError",
+    "ProtocolError",
+    "CircuitOpenError",  # retried once the breaker allows a probe
+}
+UNSENT_ERROR_TYPES = {"CircuitOpenError"}  # refused before reaching the API; not counted as an attempt
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+def is_retryable(result):
+    """True for throttling, server errors and transient transport failures"""
+    if result.ok:
+        return False
+    if result.status is not None:
+        return result.status in RETRYABLE_STATUSES or 500 <= result.status < 600
+    return result.error_type in RETRYABLE_ERROR_TYPES
+
+def was_sent(result):
+    """False when the request never left the process (e.g. the circuit breaker refused it)"""
+    return result.error_type not in UNSENT_ERROR_TYPES
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter that honours Retry-After.
+
+    With a `deadline` (seconds), each item has that long from its first send
+    for all of its attempts, not counting time spent waiting for rate-limit
+    tokens: the engine drops a retry that would start after it, and
+    http_client cuts request timeouts to the time left.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY, deadline=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def should_retry(self, result, attempt):
+        """Whether an item whose `attempt`-th try produced `result` gets another one.
+
+        A try that was never sent does not use up an attempt.
+        """
+        return is_retryable(result) and (attempt < self.max_attempts or not was_sent(result))
+
+    def delay(self, result, attempt):
+        """Seconds to wait before attempt number `attempt + 1`"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, ceiling)
+        if result.retry_after is not None:
+            delay = max(delay, result.retry_after)
+        return delay
+
+class DelayedQueue:
+    """Items waiting for their retry time, ordered by due time"""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()  # tie-breaker so items are never compared
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, item, attempt, delay, deadline=None):
+        heapq.heappush(self.heap, (time.monotonic() + delay, next(self.counter), item, attempt, deadline))
+
+    def clear(self):
+        """Drop every waiting item; returns how many there were"""
+        count, self.heap = len(self.heap), []
+        return count
+
+    def pop_ready(self):
+        """Return (item, attempt, deadline) for the earliest item that is due, or None"""
+        if self.heap and self.heap[0][0] <= time.monotonic():
+            _, _, item, attempt, deadline = heapq.heappop(self.heap)
+            return item, attempt, deadline
+        return None
+
+    def next_delay(self):
+        """Seconds until the earliest item is due, or None when empty"""
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - time.monotonic())
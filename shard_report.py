@@ -0,0 +1,136 @@
+# Report on and merge the state of sharded startup processor runs
+#
+# Each `startup_batch_processor.py --shard i/N` host keeps its own ledger,
+# progress and dead-letter files. Copy them into one directory and run
+#
+#     python shard_report.py 4            # per-shard and total counts
+#     python shard_report.py 4 --merge    # fold them into the unsharded files
+#
+# Merging is idempotent, so it can be re-run as shards finish.
+
+import argparse
+import os
+from datetime import datetime
+
+from dead_letter import DeadLetterStore
+from progress_journal import get_journal
+from sharding import shard_key_fn, shard_path
+from startup_batch_processor import DEAD_LETTER_FILE, LEDGER_FILE, PROGRESS_FILE
+from url_keys import url_key
+from work_ledger import DEAD, DONE, FAILED, IN_FLIGHT, PENDING, WorkLedger
+
+STATES = (DONE, PENDING, IN_FLIGHT, FAILED, DEAD)
+
+# A done row always wins; otherwise the most recently updated row does
+MERGE_SQL = """
+INSERT INTO items (key, item, state, attempts, last_status, last_latency_ms, last_error, updated_at, idempotency_key)
+SELECT key, item, state, attempts, last_status, last_latency_ms, last_error, updated_at, idempotency_key
+FROM shard.items WHERE true
+ON CONFLICT (key) DO UPDATE SET
+    item = excluded.item, state = excluded.state, attempts = excluded.attempts,
+    last_status = excluded.last_status, last_latency_ms = excluded.last_latency_ms,
+    last_error = excluded.last_error, updated_at = excluded.updated_at,
+    idempotency_key = COALESCE(excluded.idempotency_key, items.idempotency_key)
+WHERE items.state != 'done'
+    AND (excluded.state = 'done' OR COALESCE(excluded.updated_at, 0) > COALESCE(items.updated_at, 0))
+"""
+
+def shard_files(count):
+    """Yield (shard, ledger path, progress path, dead-letter path) for shards 1..count"""
+    for index in range(1, count + 1):
+        shard = (index, count)
+        yield shard, shard_path(LEDGER_FILE, shard), shard_path(PROGRESS_FILE, shard), shard_path(DEAD_LETTER_FILE, shard)
+
+def report(count):
+    """Print per-shard state counts and totals; returns the number of shards found"""
+    totals = dict.fromkeys(STATES, 0)
+    found = 0
+    print(f"{'shard':>10} " + " ".join(f"{state:>10}" for state in STATES) + f" {'misplaced':>10}")
+    for shard, ledger_path, _, dead_letter_path in shard_files(count):
+        label = f"{shard[0]}/{shard[1]}"
+        if not os.path.exists(ledger_path):
+            print(f"{label:>10}  missing {ledger_path}")
+            continue
+        found += 1
+        ledger = WorkLedger(ledger_path)
+        try:
+            counts = ledger.counts()
+            # Rows that hash to another shard mean a host ran with the wrong --shard
+            key_fn = shard_key_fn(url_key, shard)
+            misplaced = sum(1 for (key,) in ledger.conn.execute("SELECT key FROM items") if not key_fn(key))
+        finally:
+            ledger.close()
+        for state in STATES:
+            totals[state] += counts.get(state, 0)
+        print(f"{label:>10} " + " ".join(f"{counts.get(state, 0):>10}" for state in STATES) + f" {misplaced:>10}")
+    print(f"{'total':>10} " + " ".join(f"{totals[state]:>10}" for state in STATES))
+    return found
+
+def merge_progress(paths):
+    """Append URLs from the shard progress files that PROGRESS_FILE does not have yet"""
+    journal = get_journal(PROGRESS_FILE)
+    known = set()
+    if os.path.exists(PROGRESS_FILE):
+        with open(PROGRESS_FILE, 'r') as f:
+            known = {url_key(line.strip()) for line in f if line.strip()}
+    added = 0
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r') as f:
+            for line in f:
+                url = line.strip()
+                key = url_key(url)
+                if key and key not in known:
+                    known.add(key)
+                    journal.append([url])
+                    added += 1
+    journal.commit()
+    return added
+
+def merge(count):
+    """Fold every shard's ledger, progress and dead-letter files into the unsharded ones"""
+    files = list(shard_files(count))
+    ledger = WorkLedger(LEDGER_FILE)
+    try:
+        for shard, ledger_path, _, _ in files:
+            if not os.path.exists(ledger_path):
+                continue
+            WorkLedger(ledger_path).close()  # brings a shard ledger from an older version up to the current schema
+            ledger.conn.execute("ATTACH DATABASE ? AS shard", (ledger_path,))
+            try:
+                with ledger.conn:
+                    ledger.conn.execute(MERGE_SQL)
+            finally:
+                ledger.conn.execute("DETACH DATABASE shard")
+            print(f"[{datetime.now()}] Merged {ledger_path} into {LEDGER_FILE}")
+
+        added = merge_progress([progress_path for _, _, progress_path, _ in files])
+        print(f"[{datetime.now()}] Added {added} URLs to {PROGRESS_FILE}")
+
+        # Keep only dead letters for URLs that are still not done anywhere
+        store = DeadLetterStore(DEAD_LETTER_FILE, key_fn=url_key)
+        records = store.load()
+        for _, _, _, dead_letter_path in files:
+            records.update(DeadLetterStore(dead_letter_path, key_fn=url_key).load())
+        still_failed = [record for key, record in records.items() if ledger.get_state(key) != DONE]
+        store.rewrite(still_failed)
+        print(f"[{datetime.now()}] {len(still_failed)} failed URLs in {DEAD_LETTER_FILE}")
+    finally:
+        ledger.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report on and merge sharded startup processor state")
+    parser.add_argument("shards", type=int, help="number of shards N the hosts were started with")
+    parser.add_argument("--merge", action="store_true",
+                        help=f"merge shard state into {LEDGER_FILE}, {PROGRESS_FILE} and {DEAD_LETTER_FILE}")
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("shards must be at least 1")
+
+    found = report(args.shards)
+    if args.merge and found:
+        merge(args.shards)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Deterministic sharding of input items across hosts
+#
+# Every item is assigned to shard hash(canonical key) mod N, so N hosts given
+# the same input file split it without coordinating, and the same company
+# always lands on the same shard however the input is ordered or duplicated.
+
+import hashlib
+import os
+
+def parse_shard(value):
+    """Parse "i/N" (1-based) into an (i, N) tuple"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and N, got {value!r}")
+    return index, count
+
+def shard_of(key, count):
+    """1-based shard number for a canonical key"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+def shard_key_fn(key_fn, shard):
+    """Wrap `key_fn` so items outside `shard` get an empty key and are skipped"""
+    if shard is None:
+        return key_fn
+    index, count = shard
+
+    def key_in_shard(item):
+        key = key_fn(item)
+        return key if key and shard_of(key, count) == index else ""
+    return key_in_shard
+
+def shard_path(path, shard):
+    """Per-shard variant of a state file: processed_urls.db -> processed_urls.shard-2-of-4.db"""
+    if shard is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext}"
@@ -1,154 +1,454 @@
 # Startups Uploads
+#
+# Importing this module does no I/O: the URL list is read by main(), and the
+# heavier dependencies (requests, asyncio, sqlite3) are imported where used.
 
-import requests
-import time
+import argparse
+import itertools
 import json
+import logging
 import os
-from datetime import datetime
+import time
+import http_client
+import metrics
+import structured_log
+import transport
+from http_client import SendResult
+from progress_journal import close_journals, get_journal
+from rate_limiter import TokenBucket
+from sharding import parse_shard, shard_key_fn, shard_path
+from url_keys import url_key
 
 API_URL = "https://research-api.alphax.inc/api/v1/research/"
 HEADERS = {
     "Content-Type": "application/json",
 }
-WAIT_TIME = 300  # seconds between batches (5 minutes)
-BATCH_SIZE = 3  # number of companies to process per batch
-PROGRESS_FILE = "processed_urls.txt"  # File to track successfully processed URLs
+REQUESTS_PER_MINUTE = 0.6  # API budget (3 companies every 5 minutes)
+RATE_BURST = 3  # number of requests that may be sent back-to-back when budget has built up
+MAX_IN_FLIGHT = 8  # ceiling for the adaptive number of companies sent concurrently
+INITIAL_IN_FLIGHT = 3  # companies in flight at startup, before the limit adapts (see concurrency_control.py)
+MAX_ATTEMPTS = 5  # tries per company for throttling, 5xx and transient network failures
+ITEM_DEADLINE = 1800  # seconds from a company's first send within which all of its attempts must fit (rate-limit waits excluded)
+REPLAY_REQUESTS_PER_MINUTE = 0.6  # separate API budget for --replay-failed
+REPLAY_BURST = 1
+PROGRESS_FILE = "processed_urls.txt"  # Plain-text log of processed URLs, shared with the other processors
+LEDGER_FILE = "processed_urls.db"  # SQLite ledger with per-URL state, attempts and last outcome
 URLS_FILE = "urls.txt"  # File containing all URLs to process
+DEAD_LETTER_FILE = "failed_urls.jsonl"  # URLs that exhausted their attempts, with error details
+RESPONSE_ARCHIVE_DIR = "responses"  # compressed archive of every API response, see response_archive.py
+
+RATE_LIMITER = TokenBucket(REQUESTS_PER_MINUTE, RATE_BURST)
+
+logger = logging.getLogger("startup_batch_processor")
+
+def iter_urls(path=URLS_FILE, checkpoint=None, hold_partial=False):
+    """Yield URLs from external file one line at a time.
 
-def load_urls():
-    """Load URLs from external file"""
+    With an InputCheckpoint, reading starts at its resume offset and the
+    checkpoint follows along, so it can be saved once the URLs are scheduled.
+    With `hold_partial`, a last line without a newline (still being written)
+    is left for the next read.
+    """
     try:
-        with open(URLS_FILE, 'r') as f:
-            urls = [line.strip() for line in f if line.strip()]
-        print(f"[{datetime.now()}] Loaded {len(urls)} URLs from {URLS_FILE}")
-        return urls
-    except FileNotFoundError:
-        print(f"[{datetime.now()}] Error: {URLS_FILE} not found!")
-        return []
-    except Exception as e:
-        print(f"[{datetime.now()}] Error loading URLs: {e}")
-        return []
-
-# Load URLs from external file
-URLS = load_urls()
-def load_processed_urls():
-    """Load the list of already processed URLs from file"""
-    processed = set()
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
+        with open(path, 'rb') as f:
+            if checkpoint:
+                f.seek(checkpoint.start)
             for line in f:
-                url = line.strip()
+                if hold_partial and not line.endswith(b"\n"):
+                    break
+                if checkpoint:
+                    checkpoint.advance(line)
+                url = line.decode("utf-8", errors="replace").strip()
                 if url:
-                    # Add the URL as-is
-                    processed.add(url)
-                    # Also add normalized versions
-                    if url.startswith('https://'):
-                        # Add without protocol
-                        processed.add(url.replace('https://', ''))
-                    elif url.startswith('http://'):
-                        # Add without protocol  
-                        processed.add(url.replace('http://', ''))
-                    else:
-                        # Add with https:// protocol
-                        processed.add(f'https://{url}')
-                        # Also add with http:// protocol for completeness
-                        processed.add(f'http://{url}')
-    return processed
-
-def save_processed_urls(urls):
-    """Save successfully processed URLs to file"""
-    with open(PROGRESS_FILE, 'a') as f:
-        for url in urls:
-            f.write(f"{url}\n")
-    print(f"[{datetime.now()}] Saved {len(urls)} URLs to progress file")
-
-def get_remaining_urls(all_urls, processed_urls):
-    """Get list of URLs that haven't been processed yet"""
-    remaining = [url for url in all_urls if url not in processed_urls]
-    return remaining
-
-def send_urls(url_batch):
-    """Send a batch of URLs to the API"""
+                    yield url
+    except FileNotFoundError:
+        logger.error(f"{path} not found!")
+    except Exception as e:
+        logger.error(f"Error reading URLs: {e}")
+
+def save_processed_urls(urls, path=PROGRESS_FILE):
+    """Save successfully processed URLs to the progress journal (group-committed with fsync)"""
+    get_journal(path).append(urls)
+    logger.debug(f"Saved {len(urls)} URLs to progress file", extra={"path": path})
+
+def compact_if_grown(ledger, path):
+    """Compact a progress file full of repeats, checking again each time it doubles in size"""
+    from compact_progress import DUPLICATE_RATIO_THRESHOLD, compact
+
+    if not os.path.exists(path):
+        return
+    meta_name = f"compact-checked:{os.path.abspath(path)}"
+    if os.path.getsize(path) < 2 * int(ledger.get_meta(meta_name, 0)):
+        return
+    try:
+        before, after, rewritten = compact(path, url_key, DUPLICATE_RATIO_THRESHOLD)
+    except BlockingIOError:
+        logger.info(f"Not compacting {path}: another processor is appending to it")
+        return
+    if rewritten:
+        logger.info(f"Compacted {path}", extra={"entries_before": before, "entries_after": after})
+    ledger.set_meta(meta_name, os.path.getsize(path))
+
+def get_remaining_urls(all_urls, ledger, key_fn=url_key):
+    """Stream URLs into the ledger and yield those not processed yet, one per company.
+
+    The ledger's primary key dedupes by canonical key and its state filters
+    out processed companies, so memory use is flat however long the input is.
+    URLs for which `key_fn` returns an empty key (other shards) are skipped.
+    """
+    seen, added = ledger.enqueue(all_urls, key_fn)
+    logger.info(f"Read {seen} URLs, {added} new since the last run", extra={"read": seen, "added": added})
+    return ledger.pending()
+
+def reconcile_in_flight(ledger, archive, progress_file=PROGRESS_FILE):
+    """Settle URLs that an interrupted run left in flight, before anything is sent.
+
+    A URL whose response reached the archive after it was marked in flight
+    only lost its ledger write, so that response is recorded now. The others
+    may or may not have reached the API; they stay in flight and are resent
+    with their stored idempotency key, which the API answers with the job it
+    already started instead of a new one. Returns (settled, resent) counts.
+    """
+    settled = 0
+    resent = 0
+    for key, url, idempotency_key, marked_at in ledger.in_flight():
+        record = archive.latest(key)
+        if record is None or record["ts"] < (marked_at or 0):
+            resent += 1
+            logger.info("Company was in flight when the last run stopped - resending with its idempotency key",
+                        extra={"url": url, "idempotency_key": idempotency_key})
+            continue
+        ok = record["status"] in (200, 201)
+        latency = record["latency_ms"] / 1000 if record.get("latency_ms") is not None else None
+        if ok:
+            save_processed_urls([url], progress_file)
+        ledger.record_result(key, SendResult(ok, record["status"], latency))
+        settled += 1
+    ledger.flush()
+    return settled, resent
+
+def watch_urls(path, ledger, key_fn, stop, progress_file=PROGRESS_FILE):
+    """Endless stream of URLs appended to `path` that the ledger has not seen, until `stop` is set.
+
+    Each change to the file is read from the saved input checkpoint, so only
+    the new tail is scanned; the ledger (its pages cached by SQLite) answers
+    which URLs are new. Buffered progress is committed whenever there is
+    nothing to send.
+    """
+    from file_watcher import follow
+    from input_checkpoint import InputCheckpoint
+
+    def read(hold_partial):
+        checkpoint = InputCheckpoint(ledger, path)
+        urls = ledger.add_new(iter_urls(path, checkpoint, hold_partial), key_fn)
+        checkpoint.save()
+        if urls:
+            logger.info(f"{len(urls)} new URLs appended to {path}", extra={"added": len(urls)})
+        return urls
+
+    def idle():
+        ledger.flush()
+        get_journal(progress_file).commit()
+
+    return follow(path, read, stop, idle)
+
+def send_urls(url_batch, archive=None, idempotency_key=None):
+    """Send a batch of URLs to the API.
+
+    Rate-limit tokens are taken beforehand, by the engine's `admit` step
+    (http_client.admit). Every response the API returns is stored in `archive` (a ResponseArchive) when given.
+    `idempotency_key` (see WorkLedger.mark_in_flight) is sent with the request so
+    that a resend of a request the API already accepted does not start a second job.
+    """
+    import requests
+    from retry_policy import parse_retry_after
+
     payload = {"urls": url_batch}
+    headers = HEADERS if idempotency_key is None else {**HEADERS, http_client.IDEMPOTENCY_HEADER: idempotency_key}
     
+    start = time.monotonic()
     try:
-        response = requests.post(
+        response = http_client.post(
             API_URL,
-            headers=HEADERS,
+            headers=headers,
             data=json.dumps(payload),
-            timeout=30
-        )
+        )  # timeouts adapt to the endpoint's recent latency, see adaptive_timeout.py
+        latency = time.monotonic() - start
+        if archive is not None:
+            archive.add([url_key(url) for url in url_batch], url_batch, response.status_code, response.text, latency)
         
         if response.status_code in [200, 201]:
-            print(f"[{datetime.now()}] Success: Company processed successfully")
-            print(f"Response: {response.json()}")
-            return True
+            logger.debug("API response", extra={"urls": url_batch, "status": response.status_code,
+                                                "body": response.text, "sample": structured_log.PAYLOAD_SAMPLE_RATE})
+            return SendResult(True, response.status_code, latency)
         else:
-            print(f"[{datetime.now()}] Error: HTTP {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
+            logger.warning(f"HTTP {response.status_code} from the API", extra={
+                "urls": url_batch, "status": response.status_code, "latency_ms": round(latency * 1000, 1),
+                "body": response.text,
+            })
+            return SendResult(
+                False, response.status_code, latency, response.text[:500],
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
             
     except requests.exceptions.RequestException as e:
-        print(f"[{datetime.now()}] Request failed: {e}")
-        return False
+        logger.warning(f"Request failed: {e}", extra={"urls": url_batch, "error_type": type(e).__name__})
+        return SendResult(
+            False, None, time.monotonic() - start, f"{type(e).__name__}: {e}",
+            error_type=type(e).__name__,
+            retry_after=getattr(e, "retry_after", None),  # set while the circuit breaker is open
+        )
 
-def main():
-    wait_minutes = WAIT_TIME / 60
+def replay_dead_letters(ledger, dead_letters, progress_file=PROGRESS_FILE, archive=None):
+    """Resubmit only the URLs in the dead-letter store, with their own rate budget"""
+    from batch_engine import run_concurrent
+    from retry_policy import RetryPolicy
     
-    print("Starting URL processing service...")
+    records = dead_letters.load()
+    # Skip entries a later normal run already processed
+    failed = {key: record for key, record in records.items() if ledger.get_state(key) != "done"}
+    logger.info(f"Replaying {len(failed)} failed URLs from {dead_letters.path} "
+                f"({len(records) - len(failed)} already processed since)")
+    logger.info(f"Replay rate limit: {REPLAY_REQUESTS_PER_MINUTE} requests/minute (burst {REPLAY_BURST})")
+    if not failed:
+        dead_letters.rewrite([])
+        return
     
-    # Load previously processed URLs
-    processed_urls = load_processed_urls()
-    print(f"[{datetime.now()}] Loaded {len(processed_urls)} previously processed URLs")
+    limiter = TokenBucket(REPLAY_REQUESTS_PER_MINUTE, REPLAY_BURST)
+    ledger.clear_idempotency_keys(failed)  # a replay is a new request, not a resend of the failed one
+    idempotency_keys = {}  # url -> idempotency key stored for it in the ledger, see WorkLedger.mark_in_flight
+
+    def on_start(url):
+        idempotency_keys[url] = ledger.mark_in_flight(url_key(url))
+
+    def on_success(url, result):
+        save_processed_urls([url], progress_file)
+        ledger.record_result(url_key(url), result)
+        failed.pop(url_key(url), None)
+        logger.info("Company processed successfully", extra={"url": url, "status": result.status})
+
+    def on_failure(url, result, attempts):
+        if not isinstance(result, SendResult):
+            result = SendResult(False, error="unexpected error")  # the sender raised
+        ledger.record_result(url_key(url), result, dead=True)
+        failed[url_key(url)] = dead_letters.make_record(url, result, attempts)
+        logger.warning(f"Company failed again - kept in {dead_letters.path}", extra={
+            "url": url, "status": result.status, "error_type": result.error_type, "attempts": attempts,
+        })
+
+    try:
+        successful, _ = run_concurrent(
+            [record["item"] for record in failed.values()],
+            lambda url: send_urls([url], archive=archive, idempotency_key=idempotency_keys.get(url)),
+            on_success=on_success,
+            on_failure=on_failure,
+            max_in_flight=MAX_IN_FLIGHT,
+            on_start=on_start,
+            admit=lambda url: http_client.admit(API_URL, limiter),
+            retry=RetryPolicy(max_attempts=MAX_ATTEMPTS, deadline=ITEM_DEADLINE),
+        )
+    finally:
+        dead_letters.rewrite(failed.values())
+    logger.info(f"Replay complete: {successful} recovered, {len(failed)} still failing")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send startup URLs to the research API")
+    parser.add_argument("--urls-file", default=URLS_FILE, help=f"file with one URL per line (default: {URLS_FILE})")
+    parser.add_argument("--replay-failed", action="store_true",
+                        help=f"resubmit only the URLs in {DEAD_LETTER_FILE} instead of scanning the input")
+    parser.add_argument("--shard", metavar="i/N",
+                        help="process only shard i of N (1-based); every host gets its own ledger, "
+                             "progress and dead-letter files; combine them with shard_report.py")
+    parser.add_argument("--in-flight", type=int, metavar="N",
+                        help=f"always keep N requests in flight instead of adapting between 1 and "
+                             f"{MAX_IN_FLIGHT} to the API's latency and 429/5xx responses")
+    parser.add_argument("--requests-per-minute", type=float, default=REQUESTS_PER_MINUTE,
+                        help=f"API budget for this process (default: {REQUESTS_PER_MINUTE}); "
+                             "when sharding, give each shard its part of the total quota")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running after the list is drained and send URLs as they are appended "
+                             "to the input file (Ctrl-C or SIGTERM finishes the requests in flight and exits)")
+    parser.add_argument("--transport", default="http",
+                        help="http (default), simulated[:k=v,...] to run against an in-process model of the API, "
+                             "record:PATH to save every exchange, or replay:PATH; see transport.py")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file",
+                        help=f"write Prometheus metrics to this file every {metrics.DUMP_INTERVAL:.0f}s and on exit")
+    parser.add_argument("--log-level", default=structured_log.LOG_LEVEL,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help=f"DEBUG adds a sample of API response bodies (default: {structured_log.LOG_LEVEL})")
+    parser.add_argument("--log-format", default=structured_log.LOG_FORMAT, choices=["json", "text"],
+                        help=f"JSON lines or human-readable text (default: {structured_log.LOG_FORMAT})")
+    args = parser.parse_args(argv)
+    try:
+        args.shard = parse_shard(args.shard) if args.shard else None
+        args.transport = transport.parse_transport(args.transport)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    structured_log.configure(args.log_level, args.log_format)
+    
+    from batch_engine import run_concurrent
+    from concurrency_control import AimdController
+    from dead_letter import DeadLetterStore
+    from input_checkpoint import InputCheckpoint
+    from response_archive import ResponseArchive
+    from retry_policy import RetryPolicy
+    from work_ledger import WorkLedger
     
-    # Get remaining URLs to process
-    remaining_urls = get_remaining_urls(URLS, processed_urls)
+    transport.set_transport(args.transport)
+    # Keep pooled connections alive across rate-limit waits
+    http_client.start_keep_warm(API_URL)
     
-    print(f"Total URLs in list: {len(URLS)}")
-    print(f"Already processed: {len(processed_urls)}")
-    print(f"Remaining to process: {len(remaining_urls)}")
-    print(f"Wait time between batches: {WAIT_TIME} seconds ({wait_minutes:.1f} minutes)")
-    print(f"Batch size: {BATCH_SIZE} companies per batch")
+    if args.metrics_port is not None:
+        metrics.start_http_server(args.metrics_port)
+    if args.metrics_file:
+        metrics.start_file_dump(args.metrics_file)
     
-    if not remaining_urls:
-        print("All URLs have already been processed!")
+    logger.info("Starting URL processing service...")
+    
+    # A shard keeps its own state files and only ever sees URLs whose key hashes to it
+    shard = args.shard
+    key_fn = shard_key_fn(url_key, shard)
+    progress_file = shard_path(PROGRESS_FILE, shard)
+    if shard:
+        logger.info(f"Shard {shard[0]} of {shard[1]}")
+    
+    # A done row only becomes durable after its progress line, so processed_urls.txt never falls behind the ledger
+    ledger = WorkLedger(shard_path(LEDGER_FILE, shard), before_flush=lambda: get_journal(progress_file).commit())
+    
+    # Pick up URLs recorded in the text progress files since the last run (all of them the first time)
+    for path in dict.fromkeys([PROGRESS_FILE, progress_file]):
+        compact_if_grown(ledger, path)
+        get_journal(path)  # repairs a torn last line before it is read or appended to
+        imported = ledger.import_progress_file(path, key_fn)
+        if imported:
+            logger.info(f"Imported {imported} processed URLs from {path}")
+    
+    dead_letters = DeadLetterStore(shard_path(DEAD_LETTER_FILE, shard), key_fn=url_key)
+    # Dead-lettered URLs wait for --replay-failed (this also moves those of older ledgers out of "failed")
+    ledger.mark_dead(dead_letters.load())
+    archive = ResponseArchive(shard_path(RESPONSE_ARCHIVE_DIR, shard))
+    if args.replay_failed:
+        try:
+            replay_dead_letters(ledger, dead_letters, progress_file, archive)
+        finally:
+            archive.close()
+            ledger.close()  # commits the progress journal first, see before_flush
+            close_journals()
         return
     
-    # Process remaining URLs in batches
-    for i in range(0, len(remaining_urls), BATCH_SIZE):
-        batch = remaining_urls[i:i+BATCH_SIZE]
-        batch_number = (i // BATCH_SIZE) + 1
-        total_batches = (len(remaining_urls) + BATCH_SIZE - 1) // BATCH_SIZE  # Ceiling division
-        
-        print(f"\n[{datetime.now()}] Processing batch {batch_number}/{total_batches} ({len(batch)} companies):")
-        for url in batch:
-            print(f"  - {url}")
-        
-        # Process each URL in the batch individually
-        successful_urls = []
-        for j, url in enumerate(batch):
-            print(f"[{datetime.now()}] Processing company {j+1}/{len(batch)} in batch: {url}")
-            success = send_urls([url])  # Send as single-item list
-            
-            if success:
-                successful_urls.append(url)
-                print(f"[{datetime.now()}] Company processed successfully!")
-            else:
-                print(f"[{datetime.now()}] Company failed - will not be saved to progress file")
-        
-        # Save only the successfully processed URLs
-        if successful_urls:
-            save_processed_urls(successful_urls)
-            print(f"[{datetime.now()}] Batch complete: {len(successful_urls)}/{len(batch)} companies successful")
-        else:
-            print(f"[{datetime.now()}] Batch complete: 0/{len(batch)} companies successful")
-        
-        # Wait specified time unless it's the last batch
-        if i + BATCH_SIZE < len(remaining_urls):
-            print(f"[{datetime.now()}] Waiting {wait_minutes:.1f} minutes before next batch...")
-            time.sleep(WAIT_TIME)
+    # Record responses an interrupted run received but did not get to write down
+    settled, resent = reconcile_in_flight(ledger, archive, progress_file)
+    if settled or resent:
+        logger.info(f"Reconciled URLs left in flight: {settled} settled from the response archive, "
+                    f"{resent} to resend with their idempotency keys", extra={"settled": settled, "resent": resent})
+    
+    # Stream URLs from the input file into the ledger and get the remaining ones back
+    # Only the part of the input appended since the last run is scanned, unless it was rewritten
+    checkpoint = InputCheckpoint(ledger, args.urls_file)
+    if checkpoint.start:
+        logger.info(f"Resuming scan of {args.urls_file} at byte {checkpoint.start}")
+    remaining_urls = get_remaining_urls(iter_urls(args.urls_file, checkpoint), ledger, key_fn)
+    checkpoint.save()
+    counts = ledger.counts()
+    remaining_count = ledger.count_pending()
+    
+    logger.info(f"Already processed: {counts.get('done', 0)}, previously failed: {counts.get('failed', 0)}, "
+                f"remaining to process: {remaining_count}, left for --replay-failed: {counts.get('dead', 0)}", extra={
+                    "done": counts.get("done", 0), "failed": counts.get("failed", 0), "remaining": remaining_count,
+                    "dead": counts.get("dead", 0),
+                })
+    if args.in_flight:
+        concurrency = None
+        in_flight = f"{args.in_flight} requests in flight"
+    else:
+        concurrency = AimdController(INITIAL_IN_FLIGHT, maximum=MAX_IN_FLIGHT)
+        in_flight = f"{INITIAL_IN_FLIGHT} requests in flight (adapting up to {MAX_IN_FLIGHT})"
+    logger.info(f"Rate limit: {args.requests_per_minute} requests/minute (burst {RATE_BURST}), "
+                f"{in_flight}, {MAX_ATTEMPTS} attempts per company")
+    
+    if not remaining_count and not args.watch:
+        logger.info("All URLs have already been processed!")
+        archive.close()
+        ledger.close()
+        return
+    
+    stop = None
+    if args.watch:
+        # Keep the ledger open and feed URLs appended to the input into the same engine run;
+        # SIGINT/SIGTERM stop the whole run, backlog included, once the requests in flight finish
+        from file_watcher import stop_on_signals
+        stop = stop_on_signals()
+        logger.info(f"Watching {args.urls_file} for new URLs")
+        remaining_urls = itertools.chain(remaining_urls, watch_urls(args.urls_file, ledger, key_fn, stop, progress_file))
+    
+    # Send URLs concurrently as API budget allows, recording each outcome as soon as it lands
+    idempotency_keys = {}  # url -> idempotency key stored for it in the ledger, see WorkLedger.mark_in_flight
+
+    def on_start(url):
+        idempotency_keys[url] = ledger.mark_in_flight(url_key(url))
+
+    def on_success(url, result):
+        idempotency_keys.pop(url, None)
+        save_processed_urls([url], progress_file)
+        ledger.record_result(url_key(url), result)
+        logger.info("Company processed successfully", extra={
+            "url": url, "status": result.status, "latency_ms": round(result.latency * 1000, 1),
+        })
+
+    def on_retry(url, result, delay):
+        ledger.record_result(url_key(url), result)
+        logger.warning(f"Company failed - retrying in {delay:.0f}s", extra={
+            "url": url, "status": result.status, "error_type": result.error_type, "retry_in_s": round(delay, 1),
+        })
+
+    def on_failure(url, result, attempts):
+        idempotency_keys.pop(url, None)
+        if not isinstance(result, SendResult):
+            result = SendResult(False, error="unexpected error")  # the sender raised
+        ledger.record_result(url_key(url), result, dead=True)
+        dead_letters.add(url, result, attempts)
+        logger.error(f"Company failed - saved to {dead_letters.path} for --replay-failed", extra={
+            "url": url, "status": result.status, "error_type": result.error_type, "attempts": attempts,
+        })
+
+    rate_limiter = RATE_LIMITER
+    if args.requests_per_minute != REQUESTS_PER_MINUTE:
+        rate_limiter = TokenBucket(args.requests_per_minute, RATE_BURST)
+
+    try:
+        successful, failed = run_concurrent(
+            remaining_urls,
+            lambda url: send_urls([url], archive=archive,  # Send as single-item list
+                                  idempotency_key=idempotency_keys.get(url)),
+            on_success=on_success,
+            on_failure=on_failure,
+            max_in_flight=args.in_flight or MAX_IN_FLIGHT,
+            on_start=on_start,
+            retry=RetryPolicy(max_attempts=MAX_ATTEMPTS, deadline=ITEM_DEADLINE),
+            on_retry=on_retry,
+            concurrency=concurrency,
+            # Wait out an open circuit breaker, then for API budget instead of sleeping a fixed interval
+            admit=lambda url: http_client.admit(API_URL, rate_limiter, stop),
+            stop=stop,
+        )
+    finally:
+        archive.close()
+        ledger.close()  # commits the progress journal first, see before_flush
+        close_journals()
+        if args.metrics_file:
+            metrics.dump(args.metrics_file)
     
-    print(f"\n[{datetime.now()}] All remaining batches processed!")
+    if stop is not None and stop.is_set():
+        logger.info(f"Stopped: {successful}/{successful + failed} companies successful, the rest are sent by the next run")
+    else:
+        logger.info(f"All remaining companies processed: {successful}/{successful + failed} successful")
+    logger.info(metrics.summary())
 
 if __name__ == "__main__":
     main()
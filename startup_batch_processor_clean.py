@@ -1,1053 +1,90 @@
 # Startups Uploads
 
-import requests
-import time
 import json
-import os
 from datetime import datetime
+import http_client
+from progress_journal import get_journal
+from rate_limiter import TokenBucket
+from url_keys import url_key
 
 API_URL = "https://research-api.alphax.inc/api/v1/research/"
 HEADERS = {
     "Content-Type": "application/json",
 }
-WAIT_TIME = 120  # seconds between batches (2 minutes)
+REQUESTS_PER_MINUTE = 0.5  # API budget (one company every 2 minutes)
+RATE_BURST = 1  # number of requests that may be sent back-to-back when budget has built up
 PROGRESS_FILE = "processed_urls.txt"  # File to track successfully processed URLs
+URLS_FILE = "urls_clean.txt"  # File containing the curated URL list
+
+RATE_LIMITER = TokenBucket(REQUESTS_PER_MINUTE, RATE_BURST)
+
+def load_urls():
+    """Load URLs from external file"""
+    try:
+        with open(URLS_FILE, 'r') as f:
+            urls = [line.strip() for line in f if line.strip()]
+        print(f"[{datetime.now()}] Loaded {len(urls)} URLs from {URLS_FILE}")
+        return urls
+    except FileNotFoundError:
+        print(f"[{datetime.now()}] Error: {URLS_FILE} not found!")
+        return []
+    except Exception as e:
+        print(f"[{datetime.now()}] Error loading URLs: {e}")
+        return []
 
-URLS = [
-    "https://sakana.ai",
-    "https://elyza.ai",
-    "https://rinna.co.jp",
-    "https://citadel-ai.com",
-    "https://notta.ai",
-    "https://coefont.cloud",
-    "https://fastlabel.ai",
-    "https://www.imbesideyou.com",
-    "https://orange.inc",
-    "https://www.kotoba.tech",
-    "https://amptalk.co.jp",
-    "https://lp.datagusto.jp",
-    "https://yuimedi.com",
-    "https://goldfinch.jp",
-    "https://www.equ.ai",
-    "https://www.matchhat.com",
-    "https://www.ltid.jp",
-    "https://scurid.com",
-    "https://kjcommons.com",
-    "https://pit-step.com",
-    "https://go-spiral.ai",
-    "https://neoai.jp",
-    "https://stockmark.co.jp",
-    "https://laboro.ai",
-    "https://hacarus.com",
-    "https://exawizards.com",
-    "https://ghelia.com",
-    "https://cinnamon.is",
-    "https://leapmind.io",
-    "https://neuralpocket.com",
-    "https://www.cogent.co.jp",
-    "https://www.pkshatech.com",
-    "https://ubiehealth.com",
-    "https://ridge-i.com",
-    "https://heroz.co.jp",
-    "https://aillis.jp",
-    "https://lpixel.net",
-    "https://asilla.jp",
-    "https://ayonix.com",
-    "https://www.spectee.co.jp",
-    "https://www.revcomm.co.jp",
-    "https://tx-inc.com",
-    "https://www.mujin.co.jp",
-    "https://www.rapyuta-robotics.com",
-    "https://www.sensyn-robotics.com",
-    "https://tier4.jp",
-    "https://gitai.space",
-    "https://synspective.com",
-    "https://ai-ms.com",
-    "https://aidemy.co.jp/en/",
-    "https://autify.com",
-    "https://www.groovenauts.jp",
-    "https://inside.ai",
-    "https://alt.ai",
-    "https://www.araya.org",
-    "https://hmcom.co.jp/",
-    "https://webempath.com/",
-    "https://zeals.co.jp",
-    "https://www.connected-robotics.com",
-    "https://deepx.co.jp",
-    "https://www.flux.jp",
-    "https://idein.jp",
-    "https://abeja.asia",
-    "https://www.preferred.jp",
-    "https://www.eaglys.co.jp",
-    "https://www.ascent.ai",
-    "https://www.kyotorobotics.co.jp",
-    "https://xenoma.com",
-    "https://www.globalwalkers.co.jp/en/",
-    "https://www.nextremer.com",
-    "https://www.optim.co.jp",
-    "https://umitron.com",
-    "https://kotozna.com",
-    "https://signate.jp",
-    "https://nabl.as",
-    "https://www.datasection.co.jp",
-    "https://sagri.tokyo",
-    "https://farmnote.jp",
-    "https://holoeyes.jp",
-    "https://kaizenplatform.com",
-    "https://www.zmp.co.jp",
-    "https://alpaca.markets/jp/index.html",
-    "https://aising.jp",
-    "https://architek.co.jp/en/",
-    "https://datafluct.com/",
-    "https://allganize.ai",
-    "https://tenchijin.co.jp/",
-    "https://linkwiz.co.jp",
-    "https://spo.live",
-    "https://close-r.com",
-    "https://piecex.com",
-    "https://quantum-op.co.jp",
-    "https://biz.trustdock.io",
-    "https://swipevideo.jp",
-    "https://audiostock.jp",
-    "https://www.dotshake.com",
-    "https://gsjp.co.jp",
-    "https://www.specialist-doctor.com",
-    "https://saveexpats.com",
-    "https://interedgs.com",
-    "https://soundol.io",
-    "https://www.blue-farm.co.jp",
-    "https://zebranding.com",
-    "https://global.creditengine.jp/",
-    "https://final-aim.com/",
-    "https://www.zehitomo.com/",
-    "https://lightblue-tech.com/",
-    "https://www.trustsmith.net/",
-    "https://www.plenrobotics.com/",
-    "https://aeronext.com/",
-    "https://whill.inc",
-    "https://www.ashirase.com/",
-    "https://groove-x.com",
-    "https://avatarin.com/",
-    "https://atonarp.com/",
-    "https://cureapp.co.jp/",
-    "https://micin.jp/",
-    "https://www.lilymedtech.com/",
-    "https://synflux.io/",
-    "https://legalontech.jp/",
-    "https://www.kikagaku.co.jp/",
-    "https://axelspace.com/",
-    "https://ispace-inc.com/",
-    "https://skydisc.jp/",
-    "https://rist.co.jp/",
-    "https://www.kudan.io/",
-    "https://open8.com/",
-    "https://ecopork.co.jp/",
-    "https://www.splink.ai/",
-    "https://www.upward.jp/",
-    "https://www.unerry.co.jp/",
-    "https://www.albert2005.co.jp/",
-    "https://www.ackcio.com",
-    "https://www.botmd.io",
-    "https://www.datature.io",
-    "https://www.entropicalabs.com",
-    "https://www.evie.ai",
-    "https://www.hertzwell.com",
-    "https://www.horizonquantum.com",
-    "https://www.hydroleap.com",
-    "https://www.kinexcs.com",
-    "https://www.kronikare.ai",
-    "https://www.lucence.com",
-    "https://www.microsec.ai",
-    "https://www.movel.ai",
-    "https://www.neubatterymaterials.com",
-    "https://www.nugit.co",
-    "https://www.portcast.io",
-    "https://www.qritive.com",
-    "https://www.resynctech.com",
-    "https://www.right-hand.ai",
-    "https://www.seemode.ai",
-    "https://www.sensorflow.co",
-    "https://www.seppure.com",
-    "https://www.sixsense.ai",
-    "https://www.speqtral.space",
-    "https://www.structo3d.com",
-    "https://www.sungreenh2.com",
-    "https://www.transcelestial.com",
-    "https://www.unabiz.com",
-    "https://www.us2.ai",
-    "https://www.vrcollab.com",
-    "https://www.whitecoat.com.sg",
-    "https://tyk.io",
-    "https://www.workato.com",
-    "https://x0pa.com",
-    "https://www.iglooworks.co",
-    "https://www.cybersierra.co",
-    "https://www.secai.ai",
-    "https://www.engagerocket.co",
-    "https://wubble.ai",
-    "https://www.fanolabs.com",
-    "https://univers.com",
-    "https://www.digitalshadows.com",
-    "https://www.umamibioworks.com",
-    "https://www.matwerkz.com",
-    "https://8iox.com",
-    "https://www.vivo-surgical.com",
-    "https://factorem.co",
-    "https://tryegress.com",
-    "https://www.leapingai.com",
-    "https://www.you-shift.com/",
-    "https://www.admyral.ai",
-    "https://www.enhancedradar.com/",
-    "https://www.exintherapeutics.com/",
-    "http://tracetec.co",
-    "https://overstandlabs.com",
-    "https://delineate.pro/",
-    "https://onlook.com/",
-    "https://vetnio.com/",
-    "https://www.usecandor.ai",
-    "https://www.tryinvo.com/",
-    "https://www.edexia.ai/",
-    "https://steinmetzmotors.com/",
-    "https://uncommontherapeutics.com",
-    "https://www.bild.ai",
-    "https://www.reviserobotics.com/",
-    "https://excellence-ai.com/",
-    "https://quantstruct.com",
-    "https://nextbyte.ai",
-    "https://casixty.com",
-    "https://subimage.io",
-    "https://www.karoo.ca",
-    "https://www.astroenergy.ai/",
-    "https://www.vocalityhealth.com",
-    "https://closure-intel.com/",
-    "https://a0.dev",
-    "https://maritimefusion.com",
-    "https://sublingual.ai/",
-    "https://www.rocketable.com",
-    "https://www.trytruffle.ai/",
-    "https://heytessa.ai",
-    "https://www.orchids.app/",
-    "https://scoutforschools.com/",
-    "https://www.stampmail.ai/",
-    "https://www.conntour.com/",
-    "https://www.awen.ai/",
-    "https://axiom.trade",
-    "https://www.toothy.ai/",
-    "https://superglue.ai/",
-    "https://www.a1base.com/",
-    "https://dartboardenergy.com",
-    "https://www.dollyglot.com/",
-    "https://www.alice.tech/",
-    "https://contrario.ai",
-    "https://subtrace.dev",
-    "https://verbiflow.com",
-    "https://gopromptless.ai/",
-    "https://ovlo.ai",
-    "https://splash9.com/",
-    "https://www.gradewiz.ai/",
-    "https://caseflood.ai",
-    "https://www.runparagon.com",
-    "https://www.okiapplications.com/",
-    "https://www.zeroentropy.dev",
-    "https://www.inversionsemi.com",
-    "https://www.mecha-health.ai/",
-    "https://tryamby.com",
-    "https://adam.new/",
-    "https://trimresearch.com",
-    "https://gethealthkey.com/",
-    "https://www.hud.so",
-    "https://www.getrally.com/",
-    "https://workweave.dev",
-    "https://www.usevora.ai/",
-    "https://cardamon.ai/",
-    "https://www.operand.com/",
-    "https://www.cuckoo.so/",
-    "https://www.trytejas.ai/",
-    "https://usemosaic.ai",
-    "https://www.getswerve.com/",
-    "https://www.careCycle.ai",
-    "https://tergle.com",
-    "https://osmosis.ai/",
-    "https://cifrato.ai",
-    "https://finbar.com",
-    "https://www.salespatriot.com/",
-    "https://maive.ai",
-    "https://glnkco.com/",
-    "https://www.bindwell.ai/",
-    "https://www.trytrata.com/",
-    "https://www.withriviera.com",
-    "https://lucidic.ai",
-    "https://www.agentin.ai",
-    "https://www.bystreet.com/",
-    "https://usemirror.ai/",
-    "https://macadamialabs.com",
-    "https://www.generaltrajectory.com/",
-    "https://www.pickle.com",
-    "https://solidroad.com",
-    "https://pax.markets/",
-    "https://asteroid.ai",
-    "http://tradestrike.app",
-    "https://www.athenahq.ai",
-    "https://www.joincenote.com/",
-    "https://lucid.ai",
-    "https://confident-ai.com",
-    "https://pave-robotics.com",
-    "https://mundoai.world",
-    "https://fromolive.com",
-    "https://lopus.ai",
-    "https://augento.ai",
-    "https://waypointtransit.com",
-    "https://galevisa.com",
-    "https://rejot.dev",
-    "https://harbera.com/",
-    "https://societies.io",
-    "https://www.reditus.space/",
-    "https://infinite.dev",
-    "https://outlit.ai/",
-    "https://afterquery.com",
-    "https://archon.inc",
-    "https://gettireswing.com",
-    "https://www.triplezip.ai/",
-    "https://www.retrofit.shop/",
-    "https://startpinch.com",
-    "http://www.usemesh.com",
-    "https://www.forgeautomation.ca",
-    "https://gokarsa.com/",
-    "https://www.misprint.com",
-    "https://calltree.ai",
-    "https://www.optifye.ai",
-    "https://www.usepeppr.ai/",
-    "https://tryfuse.ai/",
-    "https://permitify.com",
-    "https://www.joindemeter.com/",
-    "https://www.sennu.ai",
-    "https://www.nitrode.com",
-    "https://exla.ai/",
-    "https://wild-card.ai",
-    "https://mastra.ai",
-    "https://www.harperinsure.com/",
-    "https://miyagilabs.ai",
-    "https://www.orbitalops.tech/",
-    "https://withwoz.com/",
-    "https://spott.io",
-    "https://browser-use.com",
-    "https://runcopycat.com",
-    "https://proception.ai/",
-    "https://thirdlayer.inc",
-    "https://tallyhq.com",
-    "https://paratushealth.com/",
-    "https://www.axal.ai/",
-    "https://assistant-ui.com",
-    "https://blindpay.com/",
-    "https://vantel.ai/",
-    "https://getbluebook.com",
-    "https://www.sammylabs.com",
-    "https://roark.ai",
-    "https://firaresearch.com/",
-    "https://dalus.io",
-    "https://www.mercura.ai",
-    "https://emojis.com/",
-    "https://www.cedarcopilot.com",
-    "http://trainloop.ai",
-    "https://tensorpool.dev",
-    "https://tamlabs.ai",
-    "https://joinergo.com",
-    "https://www.instinct-space.com/",
-    "https://www.artifact.engineer/",
-    "https://butter.dev",
-    "https://rebolt.ai",
-    "https://www.redbarnrobotics.com",
-    "https://mentra.glass",
-    "https://chatgpt.com/?utm_src=deep-research-pdf",
-    "https://www.undermind.ai",
-    "https://www.spherecast.ai/",
-    "http://abelpolice.com",
-    "http://superunit.ai",
-    "https://www.apten.ai/",
-    "https://www.acxtherapeutics.com/",
-    "https://overeasy.sh/",
-    "https://simplex.sh",
-    "https://www.miruml.com",
-    "https://coval.dev",
-    "http://www.fuseinsight.com",
-    "https://ultra.tech",
-    "https://www.spurtest.com/",
-    "https://centralhq.com",
-    "https://www.domu.ai/",
-    "https://www.ligo.bio",
-    "https://www.angstrom-ai.com",
-    "https://www.pokalabs.com/",
-    "https://hireroger.com",
-    "https://www.evolverebiosciences.com/",
-    "https://www.digitalcarbon.ai",
-    "https://www.getcodeshealth.com/",
-    "https://claimsorted.com",
-    "https://buildwithpre.com",
-    "https://www.gotabular.de/en/",
-    "https://understoodcare.com",
-    "https://comfydeploy.com",
-    "https://www.cheers.tech",
-    "https://doublezero.tech",
-    "https://hamming.ai/",
-    "https://bayesline.com",
-    "https://www.prohost.ai/",
-    "https://theseus.us",
-    "https://flyflow.ai",
-    "https://stack-auth.com",
-    "https://www.mdhub.ai/",
-    "https://www.synnaxlabs.com/",
-    "https://spaceium.com",
-    "https://mem0.ai",
-    "https://www.educato.ai/",
-    "https://invaria.com",
-    "https://unsloth.ai/",
-    "https://glasskube.dev/",
-    "https://www.entangl.com/",
-    "https://getcallback.ai",
-    "https://saphira.ai",
-    "https://www.proxis.ai/",
-    "https://www.clarahomecare.com/",
-    "https://www.decisional.com/",
-    "https://videogen.io",
-    "https://azalearobotics.com/",
-    "https://firstwork.com",
-    "https://wordware.ai/",
-    "https://trymaitai.ai",
-    "https://sorcerer.earth",
-    "https://ideate.xyz",
-    "https://getunbound.ai/",
-    "https://www.rewbi.com/",
-    "https://www.deepsim.io",
-    "https://phonely.ai",
-    "https://zuni.app",
-    "https://www.useelevate.dev/",
-    "https://www.hyrex.io",
-    "https://storia.ai",
-    "https://networkocean.io/",
-    "https://corgi.insure",
-    "https://cloudglue.dev",
-    "https://scape.app",
-    "https://www.retrofix.ai/",
-    "https://www.useoffstream.com/",
-    "https://silurian.ai/",
-    "https://stardrift.ai",
-    "https://kenley.ai/",
-    "https://mitohealth.com/",
-    "https://withgauge.com",
-    "https://dench.com",
-    "https://www.dodo.health/",
-    "https://runlocal.ai",
-    "https://ledgerup.ai/",
-    "https://github.com/aditya-nadkarni/spongecake",
-    "https://www.aminoanalytica.com",
-    "https://www.camfer.dev/",
-    "https://www.weaverobots.com",
-    "https://www.snowpilot.com",
-    "https://himodus.com",
-    "https://aresindustries.com",
-    "https://tivara.com",
-    "https://www.codeviz.ai/",
-    "https://www.dmodel.ai",
-    "https://lighthouz.ai/",
-    "https://www.runpulse.com/",
-    "https://tandem.space/",
-    "https://zenbase.ai",
-    "https://minusx.ai",
-    "https://parahelp.com/",
-    "http://www.plumefinder.com",
-    "https://autopallet.bot",
-    "https://luciblefi.com",
-    "https://kopra.bio",
-    "https://redouble.ai/",
-    "https://www.fazeshift.com/",
-    "https://www.benchify.com",
-    "https://www.1849.bio",
-    "https://www.substrate.cc/",
-    "https://www.usepromi.com/",
-    "https://www.hestus.co",
-    "https://www.finnyai.com/",
-    "https://www.joinplanbase.com/",
-    "https://zoaresearch.com",
-    "https://anthrogen.com",
-    "https://kastle.ai/",
-    "https://www.magicode.ai/",
-    "https://vibe.codes",
-    "https://www.ontramobility.com",
-    "https://getpanora.com",
-    "https://nerve.run",
-    "https://anara.com",
-    "https://www.taxgpt.com",
-    "https://www.SaturnOS.com",
-    "https://creativemode.net",
-    "https://clearly-ai.com",
-    "https://expand.ai/",
-    "https://dimely.com/",
-    "https://www.reactwise.com/",
-    "https://manaflow.com",
-    "https://conveo.ai/",
-    "https://emergent.sh",
-    "https://www.drillbit.com",
-    "https://zeit-ai.com/",
-    "https://intryc.com",
-    "https://parley.so",
-    "https://soff.ai",
-    "https://www.hireseals.ai/",
-    "https://www.biocartesian.com",
-    "https://beebettor.com",
-    "https://www.thundercompute.com",
-    "https://paxai.com/",
-    "https://www.remade.ai/",
-    "https://www.emberrobotics.com",
-    "https://www.conductorquantum.com",
-    "https://trypinnacle.app/",
-    "https://www.autumnlabs.io/",
-    "https://opslane.com",
-    "https://modernrealty.io",
-    "https://distro.app",
-    "https://www.stempad.com",
-    "https://trykura.com",
-    "https://asterisk.so",
-    "https://www.deepsilicon.net/",
-    "https://try.solar",
-    "https://www.withdavid.ai/",
-    "https://tryhelium.com",
-    "https://www.cerulion.com",
-    "https://www.brighterway.ai/",
-    "https://www.odo.do/",
-    "http://mineflow.ai/",
-    "https://www.praxos.ai",
-    "https://cartage.ai",
-    "https://winfordwealth.com",
-    "https://exalaboratories.com",
-    "https://withblast.com",
-    "https://www.finosu.com",
-    "https://senseirobotics.com",
-    "https://www.lmnr.ai/",
-    "https://www.presti.ai/",
-    "https://www.palmier.io",
-    "https://haystackeditor.com/",
-    "https://www.tryandai.com/",
-    "https://www.theforecastingcompany.com",
-    "https://www.usesimple.ai",
-    "https://www.schemeflow.com",
-    "https://www.drive-thru.ai/",
-    "https://www.riskangle.com/",
-    "https://guardianrf.com/",
-    "https://www.baselinetrials.com/",
-    "https://paasa.com",
-    "http://writewithpumpkin.com/",
-    "https://zeropath.com",
-    "https://weel.live/",
-    "https://www.focusbuddy.ai/?ref=yc",
-    "https://getremo.ai",
-    "https://typa.ai",
-    "https://www.argil.ai/",
-    "https://vendra-marketplace.io/",
-    "https://polymet.ai",
-    "https://assemblyhoa.com",
-    "https://dataleap.ai/",
-    "https://www.omnidock.com",
-    "https://moretapay.com",
-    "https://www.withzimi.com",
-    "https://ionworks.com/",
-    "https://www.meetthyme.com/",
-    "https://www.sepalai.com",
-    "https://www.propaya.com",
-    "https://www.autarc.energy/en",
-    "https://rescript.ai/",
-    "https://www.simplifine.com",
-    "https://kontigo.lat/",
-    "https://getquetzal.com/",
-    "https://www.starcloud.com/",
-    "https://www.tradeflowai.com/",
-    "https://voker.ai",
-    "https://heroui.chat",
-    "https://www.therentflow.com",
-    "https://www.rowboatlabs.com",
-    "https://ficra.ai/",
-    "https://diode.computer",
-    "https://trykeet.com",
-    "https://www.shipoway.com",
-    "https://blaze.money",
-    "https://www.anglera.com/",
-    "https://joinpap.com/",
-    "https://heyrevia.ai",
-    "https://www.aisell.com",
-    "https://surebright.com/",
-    "https://XTraffic.com/",
-    "https://browserOS.com/",
-    "https://bucket.bot",
-    "https://www.usul.com",
-    "https://pipeshift.com",
-    "https://voideditor.com",
-    "https://useterra.com/",
-    "https://pharos.health/",
-    "https://www.vera-health.ai",
-    "http://www.henry.ai",
-    "https://www.et-al.io",
-    "https://saldor.com/",
-    "https://www.elayne.com/",
-    "https://usemica.com/",
-    "https://www.arva.ai",
-    "https://www.capitol.ai/",
-    "https://patched.codes",
-    "https://villagelabs.app/",
-    "https://www.getpathpilot.com/",
-    "https://midship.ai/",
-    "https://conductor.build",
-    "https://www.dreamrp.com/",
-    "https://www.syntra.com",
-    "https://bitstoatoms.com/",
-    "https://www.formulainsight.io/",
-    "https://affil.ai/",
-    "https://simcare.ai",
-    "https://www.merlinai.co",
-    "https://www.freestyle.sh",
-    "https://www.overlap.ai",
-    "https://generalanalysis.com",
-    "https://trykairo.com/",
-    "https://orgorg.com",
-    "https://outerport.com",
-    "https://chatgpt.com/?utm_src=deep-research-pdf",
-    "https://tesseral.com",
-    "https://www.thepurplepages.ai/",
-    "https://www.governgpt.com/",
-    "https://www.scritchai.com",
-    "https://www.greptile.com",
-    "http://navier.ai",
-    "https://www.onyx.app/",
-    "https://www.gumloop.com/",
-    "https://www.legora.com/",
-    "https://ego.live",
-    "https://upsolve.ai/",
-    "https://www.stitch.tech",
-    "https://www.radmate.ai",
-    "https://www.driverai.com/",
-    "https://askjo.ai",
-    "https://www.drymerge.com",
-    "https://www.ehl.markets/",
-    "https://www.ubicloud.com",
-    "http://lantern.dev",
-    "https://yenmo.in/",
-    "https://www.nuvi.dev/",
-    "https://reducto.ai",
-    "https://www.ourmaia.com/",
-    "https://duckie.ai/",
-    "https://tile.sh",
-    "https://www.ncompass.tech",
-    "https://www.ion.design/",
-    "https://tracecat.com",
-    "https://www.tuesdaylab.com",
-    "https://www.dgiapparel.com/",
-    "http://buster.so",
-    "https://soniahealth.com",
-    "https://momentic.ai",
-    "https://themangohealth.com",
-    "https://happenstance.ai",
-    "https://getlumen.dev",
-    "https://www.withgarage.com/",
-    "https://www.malibou.co",
-    "https://www.aidyhq.com/",
-    "https://pivotrobotics.com",
-    "https://www.quary.dev",
-    "https://andonlabs.com/",
-    "https://www.nuanced.dev/",
-    "https://precip.ai",
-    "https://www.kabilah.com",
-    "https://www.argon-ai.com/",
-    "https://alex.com",
-    "https://www.maihem.com",
-    "https://joinnewton.com",
-    "https://runtrellis.com/",
-    "https://atpatchwork.com/",
-    "https://basalt.space/",
-    "https://suretynow.com/",
-    "https://www.askassembly.app/",
-    "https://www.paradigmai.com/",
-    "https://www.eggnog.ai",
-    "https://www.greenboard.com",
-    "https://ecliptor.ai",
-    "https://tokenowl.ai",
-    "https://www.copperhealth.co/",
-    "https://usecarousel.com",
-    "https://www.synsorybio.com/",
-    "https://www.yonedalabs.com",
-    "https://www.octolane.com",
-    "https://agenticlabs.com",
-    "https://www.leaping.io/",
-    "https://getroe.ai",
-    "https://mathdash.com",
-    "https://artisan.co/?utm_source=ycombinator",
-    "https://www.starlightcharging.com",
-    "https://pointone.com/",
-    "https://www.topo.io/",
-    "https://versetherapy.com",
-    "https://www.blumebenefits.com/",
-    "https://www.arini.ai",
-    "https://www.furtherai.com/",
-    "https://fractal-labs.gg/",
-    "https://www.lucite.ai/",
-    "http://attunement.ai",
-    "https://www.guidelabs.ai/",
-    "https://joinswift.app",
-    "https://speck.sh",
-    "https://clarionhealth.com",
-    "https://double.finance/",
-    "http://www.seleramedical.com",
-    "https://getomni.ai",
-    "https://engines.dev",
-    "https://trypartnerhq.com",
-    "https://www.onegrep.dev",
-    "https://getdecipher.com",
-    "https://celest.dev",
-    "https://keywordsai.co",
-    "https://www.tamarind.bio",
-    "https://tryintercept.com/",
-    "https://www.starjar.io/",
-    "https://promptarmor.com/",
-    "https://cloudcruise.com",
-    "https://14.ai",
-    "http://atopile.io",
-    "https://meticulate.ai/",
-    "https://www.lemonslice.com",
-    "https://zaymo.com",
-    "https://www.withglimmer.com/",
-    "https://usetusk.ai",
-    "https://toolify.sh",
-    "https://www.usecentralize.com/",
-    "https://astromecha.co/",
-    "https://lytix.co/",
-    "https://draftaid.io/",
-    "https://pandas-ai.com",
-    "https://www.infinityapp.in/",
-    "https://firebender.com",
-    "https://ellipsis.dev",
-    "https://sagaland.ai",
-    "https://www.bilanc.co",
-    "https://open.cx",
-    "https://www.browserbuddy.com/",
-    "https://www.useresonance.com/",
-    "https://superagent.sh/",
-    "https://www.aethergtm.com/",
-    "https://pythagora.ai/",
-    "https://www.nonescape.com",
-    "https://codeant.ai/",
-    "https://www.beparallel.com/?utm_source=ycombinator&utm_medium=directory",
-    "https://www.ragas.io",
-    "https://metofico.com/",
-    "https://www.salvy.com.br",
-    "https://phospho.ai",
-    "https://www.wuri.in/",
-    "https://www.inquery.ai/",
-    "https://www.crmcopilot.co?utm_source=yc",
-    "https://www.dimehealth.ai/",
-    "https://sync.so/",
-    "https://conduit.ai/",
-    "https://tryrisotto.com",
-    "http://www.toma.com/",
-    "https://edgetrace.ai",
-    "https://opencall.ai",
-    "https://centauri-ai.tech",
-    "https://with-andy.com",
-    "https://chunkr.ai/",
-    "https://clarum.ai",
-    "https://prosights.co/",
-    "https://yondu.ai/",
-    "https://trieve.ai",
-    "https://offdeal.io",
-    "https://soundry.ai/",
-    "https://www.raindrop.ai",
-    "https://getaftercare.com",
-    "https://www.manifoldfreight.com/",
-    "https://voicepanel.com",
-    "https://elodin.systems/",
-    "http://www.dianahr.ai",
-    "https://www.shiboleth.ai/",
-    "https://www.joincarma.com/",
-    "https://delve.co/?utm_source=yc&utm_medium=bio&utm_campaign=delve",
-    "https://www.preloop.com",
-    "https://hazelai.com",
-    "https://www.tryabel.com",
-    "https://www.tensorfuse.io/",
-    "https://www.storioai.com",
-    "http://betterbasket.ai",
-    "https://focalml.com",
-    "https://www.stacksync.com/",
-    "https://sonauto.ai/",
-    "https://www.artosai.com/",
-    "https://givefront.com",
-    "https://www.shepherd.study",
-    "https://www.velorumtx.com/",
-    "https://circleback.ai",
-    "https://thorntale.com",
-    "https://www.sparkhq.ai",
-    "https://downlink.dev/",
-    "https://hatchet.run",
-    "https://www.lumetric.ai/",
-    "http://bitesight.com",
-    "https://useultra.ai",
-    "https://www.modelml.com/",
-    "https://getalai.com",
-    "https://www.openmart.com",
-    "https://brainbaselabs.com",
-    "https://business.triply.co/",
-    "https://www.getzep.com/",
-    "https://www.omacare.com",
-    "https://www.terrakotta.ai/",
-    "https://justwords.ai",
-    "https://camelai.com/",
-    "https://samplehc.com",
-    "https://www.getcleva.com",
-    "https://marblism.com",
-    "https://penciled.com",
-    "https://www.fileforge.com/",
-    "https://www.goldenbasis.com",
-    "https://www.xpaycheckout.com/",
-    "https://datacurve.ai/",
-    "https://retellai.com",
-    "https://www.basepilot.com/",
-    "https://withaqua.com",
-    "http://www.senso.ai",
-    "https://www.powderfi.com/",
-    "http://www.getveles.com",
-    "http://www.miden.co",
-    "https://commodityai.io/",
-    "https://www.lumona.ai",
-    "https://vistapower.com",
-    "http://rovecard.com",
-    "http://www.erisbio.com",
-    "https://oddsview.com",
-    "https://getfluently.app/",
-    "https://pernell.ai",
-    "https://magichour.ai",
-    "https://www.rysemarket.com/",
-    "https://www.deepnight.ai/",
-    "https://www.openfoundry.ai/",
-    "https://www.rohanmehta.com/",
-    "https://silogy.io",
-    "https://useocular.com",
-    "https://piramidal.ai",
-    "https://www.trytrueclaim.com",
-    "https://www.integuru.ai",
-    "https://dragoneye.ai/",
-    "https://www.voxopsai.com/",
-    "http://renderlet.com",
-    "https://info.mathos.ai/",
-    "https://www.junction.bio/",
-    "https://crowdvolt.com/",
-    "https://www.healiahealth.com/",
-    "https://same.new",
-    "https://www.reformhq.com",
-    "https://www.forgehq.com/",
-    "https://www.quivr.app/",
-    "https://newmoneycompany.com",
-    "https://blacksmith.sh/",
-    "http://getcrux.ai/",
-    "https://www.nowhouse.io",
-    "https://cocrafter.com/",
-    "https://www.inspectmind.ai",
-    "https://repromptai.com",
-    "https://withtower.com",
-    "https://fumedev.com",
-    "https://www.yarn.so",
-    "https://www.kater.ai",
-    "https://www.haplotypelabs.com/",
-    "https://www.granzabio.com/",
-    "https://parcelbio.com/",
-    "https://kscale.dev/",
-    "http://www.indemni.com",
-    "https://www.retailreadyai.com/",
-    "https://www.marrlabs.com/",
-    "https://www.dropback.com",
-    "https://www.joinforge.app/",
-    "https://chatgpt.com/?utm_src=deep-research-pdf",
-    "https://browse.dev",
-    "https://wayline.com",
-    "https://withnixo.com/",
-    "https://syntheticsociety.ai/",
-    "https://stormy.ai",
-    "https://www.ambral.com/",
-    "https://www.joingaus.com/",
-    "https://serafis.ai",
-    "https://agentmail.to",
-    "https://halluminate.ai/",
-    "https://www.acrely.ai",
-    "https://parametric.company/",
-    "https://useautumn.com",
-    "https://fluidize.ai",
-    "https://mypingoai.com",
-    "https://www.truthsystems.ai",
-    "https://rid.me",
-    "https://www.lanesurf.com/",
-    "https://www.cactuscompute.com/",
-    "http://blank.bio/",
-    "https://closera.com",
-    "https://traceroot.ai",
-    "https://www.mangodesk.com/",
-    "https://useskope.com",
-    "https://datafruit.dev/",
-    "https://imprezia.ai",
-    "https://www.nuntius.ai",
-    "https://yoursentinel.ai",
-    "https://tryjanet.ai",
-    "https://www.frizzle.com",
-    "https://alterai.dev",
-    "https://contextfort.ai/",
-    "https://trypond.ai",
-    "https://www.designarena.ai/",
-    "https://uselark.ai/",
-    "https://tryghostship.dev/",
-    "https://video.golpoai.com/",
-    "https://www.lotas.ai",
-    "https://monarcha.ai",
-    "https://www.cyberdesk.io",
-    "https://www.async.build/",
-    "https://www.pharmie.app/",
-    "https://www.qualify.bot/",
-    "https://orangeslice.ai",
-    "https://zeroeval.com",
-    "https://vernerobotics.com/",
-    "https://www.herdora.com",
-    "https://www.tryshor.com",
-    "https://www.theliva.ai",
-    "https://getlilac.com",
-    "https://www.riverbanksecurity.com/",
-    "https://withkeystone.com",
-    "https://bootloop.ai/",
-    "https://b12-labs.com/",
-    "https://digpangolin.com",
-    "https://parachute-ai.com",
-    "https://www.withlemma.com",
-    "https://www.wedge.health",
-    "https://www.kestroll.com/",
-    "https://www.trace.so/",
-    "https://nexa.farm/",
-    "https://ironledger.ai",
-    "https://joinsidekick.com",
-    "https://stockline.ai",
-    "https://www.embedder.dev/",
-    "https://candytrail.ai/",
-    "https://cocreate.so",
-    "https://ghosteye.ai",
-    "https://www.preempt.me",
-    "https://www.slashy.ai/",
-    "https://trychannel3.com",
-    "https://www.agenthublabs.com",
-    "https://epicenter.so/",
-    "https://doe.so/",
-    "https://www.useflai.com/",
-    "https://www.louiza.ai/",
-    "https://www.careswift.com/",
-    "https://deepawareai.com/",
-    "https://autosana.ai",
-    "https://www.albacore.inc",
-    "https://observee.com/",
-    "https://www.novaflowapp.com/",
-    "https://www.mimos-ai.com/",
-    "https://hyprnote.com",
-    "https://motives.ai/",
-    "https://knowlify.net/",
-    "https://perseusdefense.ai",
-    "https://www.risely.ai/",
-    "http://alaradental.com",
-    "https://phases.ai",
-    "https://getsocratix.ai",
-    "https://www.gofinto.com/",
-    "https://goriff.com/",
-    "https://trymohi.com/",
-    "https://www.normalfactory.com/",
-    "https://omnara.com",
-    "https://floot.com",
-    "https://comena.ai",
-    "https://tryapril.com",
-    "https://gominimal.ai/",
-    "https://mcp-use.com",
-    "https://getirongrid.com/",
-    "https://www.nozomio.com/",
-    "https://trysummon.com",
-    "https://vibeflow.ai/",
-    "https://solvatechnology.com",
-    "https://useflywheel.ai/",
-    "https://www.certus-ai.com/",
-    "https://www.sigmanticai.com",
-    "https://stagewise.io",
-    "https://sira.team",
-    "https://dscribeai.com/",
-    "https://clodo.ai",
-    "https://www.palace.so",
-    "https://avelishealth.com",
-    "https://idler.ai/",
-    "https://humoniq.ai",
-    "https://www.daymi.ai/",
-    "https://www.onkernel.com/",
-    "https://okibi.ai",
-    "https://usejuxta.org",
-    "https://hera.video/",
-    "https://reacherapp.com/",
-    "https://convexia.bio",
-    "https://pally.com",
-    "https://www.magnetictax.com",
-    "https://www.pares.ai/",
-    "https://altur.io",
-    "https://fleetline.ai",
-    "https://www.notte.cc/",
-    "https://f4.dev/",
-    "https://tryeden.ai",
-    "https://opennote.com",
-    "https://www.locatahealth.com/",
-    "https://interfere.com",
-    "https://www.tecto.ai/",
-    "https://upliftai.org/",
-    "https://getpaloma.ai/",
-    "https://perspectiveshealth.ai/",
-    "https://www.outrove.ai/",
-    "https://www.aventindustrial.com",
-    "https://heyblue.com/",
-    "https://www.spotlight.realty",
-    "https://freyavoice.ai/",
-    "https://www.vulcan-tech.com/",
-    "http://anytrace.ai/",
-    "https://noxmetals.co/",
-    "https://getburnt.ai/",
-    "https://luminalai.com",
-    "http://www.therealroots.com",
-    "https://www.cacaofi.com/",
-    "https://noso.so",
-    "https://modelence.com",
-    "http://veritusagent.ai",
-    "https://mobileoperator.com"
-]
 
 def load_processed_urls():
-    """Load the list of already processed URLs from file"""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            return set(line.strip() for line in f if line.strip())
-    return set()
+    """Open the on-disk index of canonical keys of already processed URLs.
+
+    The index supports `key in processed` without loading every key into
+    memory. A file that is mostly repeats is compacted to its unique keys first.
+    """
+    from compact_progress import compact, needs_compaction
+    from membership_index import open_index
+
+    get_journal(PROGRESS_FILE).flush()  # repairs a torn last line on first use
+    processed = open_index(PROGRESS_FILE, url_key)
+    if needs_compaction(processed.entries, len(processed)):
+        processed.close()
+        try:
+            before, after, _ = compact(PROGRESS_FILE, url_key)
+            print(f"[{datetime.now()}] Compacted {PROGRESS_FILE}: {before} -> {after} entries")
+        except BlockingIOError:
+            print(f"[{datetime.now()}] Not compacting {PROGRESS_FILE}: another processor is appending to it")
+        processed = open_index(PROGRESS_FILE, url_key)
+    return processed
 
 def save_processed_urls(urls):
-    """Save successfully processed URLs to file"""
-    with open(PROGRESS_FILE, 'a') as f:
-        for url in urls:
-            f.write(f"{url}\n")
+    """Save successfully processed URLs to the progress journal (group-committed with fsync)"""
+    get_journal(PROGRESS_FILE).append(urls)
     print(f"[{datetime.now()}] Saved {len(urls)} URLs to progress file")
 
 def get_remaining_urls(all_urls, processed_urls):
-    """Get list of URLs that haven't been processed yet"""
-    remaining = [url for url in all_urls if url not in processed_urls]
+    """Get list of URLs that haven't been processed yet, one per company"""
+    remaining = []
+    scheduled = set()
+    for url in all_urls:
+        key = url_key(url)
+        if key and key not in processed_urls and key not in scheduled:
+            scheduled.add(key)
+            remaining.append(url)
     return remaining
 
 def send_urls(url_batch):
     """Send a batch of URLs to the API"""
+    import requests
+
     payload = {"urls": url_batch}
     
+    # Wait out an open circuit breaker, then for API budget instead of sleeping a fixed interval between companies
+    http_client.admit(API_URL, RATE_LIMITER)
+    
     try:
-        response = requests.post(
+        response = http_client.post(
             API_URL,
             headers=HEADERS,
             data=json.dumps(payload),
-            timeout=30
-        )
+        )  # timeouts adapt to the endpoint's recent latency, see adaptive_timeout.py
         
         if response.status_code == 200:
             print(f"[{datetime.now()}] Success: Batch sent successfully")
@@ -1063,21 +100,25 @@ def send_urls(url_batch):
         return False
 
 def main():
-    wait_minutes = WAIT_TIME / 60
+    # Keep pooled connections alive across rate-limit waits
+    http_client.start_keep_warm(API_URL)
     
     print("Starting URL processing service...")
     
+    # Load URLs from external file
+    urls = load_urls()
+    
     # Load previously processed URLs
     processed_urls = load_processed_urls()
     print(f"[{datetime.now()}] Loaded {len(processed_urls)} previously processed URLs")
     
     # Get remaining URLs to process
-    remaining_urls = get_remaining_urls(URLS, processed_urls)
+    remaining_urls = get_remaining_urls(urls, processed_urls)
     
-    print(f"Total URLs in list: {len(URLS)}")
+    print(f"Total URLs in list: {len(urls)}")
     print(f"Already processed: {len(processed_urls)}")
     print(f"Remaining to process: {len(remaining_urls)}")
-    print(f"Wait time between companies: {WAIT_TIME} seconds ({wait_minutes:.1f} minutes)")
+    print(f"Rate limit: {REQUESTS_PER_MINUTE} requests/minute (burst {RATE_BURST})")
     
     if not remaining_urls:
         print("All URLs have already been processed!")
@@ -1097,11 +138,6 @@ def main():
         else:
             print(f"[{datetime.now()}] Company failed - not saving to progress file")
             print("You can restart the script to retry failed companies")
-        
-        # Wait specified time unless it's the last URL
-        if i + 1 < len(remaining_urls):
-            print(f"[{datetime.now()}] Waiting {wait_minutes:.1f} minutes before next company...")
-            time.sleep(WAIT_TIME)
     
     print(f"\n[{datetime.now()}] All remaining companies processed!")
 
@@ -1,17 +1,19 @@
 # Startups Uploads - TEST VERSION
-
-import requests
-import time
-import json
-import os
-from datetime import datetime
-
-API_URL = "https://research-api.alphax.inc/api/v1/research/"
-HEADERS = {
-    "Content-Type": "application/json",
-}
-WAIT_TIME = 600  # milliseconds between batches
-PROGRESS_FILE = "processed_urls.txt"  # File to track successfully processed URLs
+#
+# Runs the production processor (startup_batch_processor.py) on a small URL
+# list, with its own state files and against the simulated API by default, so
+# tests exercise exactly the code that runs in production. --items scales the
+# list up with synthetic companies, e.g. 100x for a load test:
+#
+#     python startup_batch_processor_test.py
+#     python startup_batch_processor_test.py --items 300 --transport simulated:latency=0.05,throttle_rate=0.1
+#     python startup_batch_processor_test.py --transport http     # really send the test URLs
+#
+# Any other startup_batch_processor.py option is passed through.
+
+import argparse
+
+import startup_batch_processor as processor
 
 # Test with first 3 URLs only
 URLS = [
@@ -19,95 +21,34 @@ URLS = [
     "https://elyza.ai",
     "https://rinna.co.jp",
 ]
-
-def load_processed_urls():
-    """Load the list of already processed URLs from file"""
-    if os.path.exists(PROGRESS_FILE):
-        with open(PROGRESS_FILE, 'r') as f:
-            return set(line.strip() for line in f if line.strip())
-    return set()
-
-def save_processed_urls(urls):
-    """Save successfully processed URLs to file"""
-    with open(PROGRESS_FILE, 'a') as f:
-        for url in urls:
-            f.write(f"{url}\n")
-    print(f"[{datetime.now()}] Saved {len(urls)} URLs to progress file")
-
-def get_remaining_urls(all_urls, processed_urls):
-    """Get list of URLs that haven't been processed yet"""
-    remaining = [url for url in all_urls if url not in processed_urls]
-    return remaining
-
-def send_urls(url_batch):
-    """Send a batch of URLs to the API"""
-    payload = {"urls": url_batch}
-    
-    try:
-        response = requests.post(
-            API_URL,
-            headers=HEADERS,
-            data=json.dumps(payload),
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            print(f"[{datetime.now()}] Success: Batch sent successfully")
-            print(f"Response: {response.json()}")
-            return True
-        else:
-            print(f"[{datetime.now()}] Error: HTTP {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        print(f"[{datetime.now()}] Request failed: {e}")
-        return False
-
-def main():
-    wait_minutes = WAIT_TIME / 60
-    
-    print("Starting URL processing service...")
-    print("*** TESTING MODE: Processing only first 3 URLs ***")
-    
-    # Load previously processed URLs
-    processed_urls = load_processed_urls()
-    print(f"[{datetime.now()}] Loaded {len(processed_urls)} previously processed URLs")
-    
-    # Get remaining URLs to process
-    remaining_urls = get_remaining_urls(URLS, processed_urls)
-    
-    print(f"Total URLs in list: {len(URLS)}")
-    print(f"Already processed: {len(processed_urls)}")
-    print(f"Remaining to process: {len(remaining_urls)}")
-    print(f"Wait time between batches: {WAIT_TIME} seconds ({wait_minutes:.1f} minutes)")
-    
-    if not remaining_urls:
-        print("All URLs have already been processed!")
-        return
-    
-    # Process remaining URLs in batches of 3
-    for i in range(0, len(remaining_urls), 3):
-        batch = remaining_urls[i:i+3]
-        batch_number = (i // 3) + 1
-        total_batches = (len(remaining_urls) + 2) // 3  # Round up division
-        
-        print(f"\n[{datetime.now()}] Processing batch {batch_number}/{total_batches}: {batch}")
-        success = send_urls(batch)
-        
-        if success:
-            # Save successfully processed URLs
-            save_processed_urls(batch)
-        else:
-            print(f"[{datetime.now()}] Batch failed - not saving to progress file")
-            print("You can restart the script to retry failed batches")
-        
-        # Wait specified time unless it's the last batch
-        if i + 3 < len(remaining_urls):
-            print(f"[{datetime.now()}] Waiting {wait_minutes:.1f} minutes before next batch...")
-            time.sleep(WAIT_TIME)
-    
-    print(f"\n[{datetime.now()}] All remaining batches processed!")
+TRANSPORT = "simulated:latency=0.2"  # in-process model of the API, see transport.py
+REQUESTS_PER_MINUTE = 6000  # the simulated API has no quota worth waiting for; pass a lower value with --transport http
+URLS_FILE = "urls_test.txt"  # written on every run from URLS (and --items)
+PROGRESS_FILE = "processed_urls_test.txt"  # test state, kept apart from the production files
+LEDGER_FILE = "processed_urls_test.db"
+DEAD_LETTER_FILE = "failed_urls_test.jsonl"
+RESPONSE_ARCHIVE_DIR = "responses_test"
+
+def write_urls(path, items):
+    """Write URLS, padded with synthetic companies up to `items`, one per line"""
+    urls = URLS[:items] + [f"https://test-company-{i}.example.com" for i in range(len(URLS), items)]
+    with open(path, "w") as f:
+        f.writelines(f"{url}\n" for url in urls)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the URL processor on a test list against the simulated API")
+    parser.add_argument("--items", type=int, default=len(URLS), help=f"companies to send (default: {len(URLS)})")
+    args, passthrough = parser.parse_known_args(argv)
+
+    # Redirect the processor's state to the test files before it runs
+    processor.PROGRESS_FILE = PROGRESS_FILE
+    processor.LEDGER_FILE = LEDGER_FILE
+    processor.DEAD_LETTER_FILE = DEAD_LETTER_FILE
+    processor.RESPONSE_ARCHIVE_DIR = RESPONSE_ARCHIVE_DIR
+
+    write_urls(URLS_FILE, args.items)
+    processor.main(["--urls-file", URLS_FILE, "--transport", TRANSPORT,
+                    "--requests-per-minute", str(REQUESTS_PER_MINUTE)] + passthrough)
 
 if __name__ == "__main__":
     main()
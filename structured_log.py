@@ -0,0 +1,126 @@
+# Structured, non-blocking logging for the batch processors
+#
+# Log calls only put the record on an in-memory queue (QueueHandler); a
+# background QueueListener formats and writes them, so a slow terminal or
+# pipe never stalls a sender. Records are written as JSON lines by default,
+# with any `extra={...}` fields as top-level keys, or in the old
+# "[timestamp] message" form with --log-format text.
+#
+# Response payloads are logged at DEBUG with a `sample` rate (only that share
+# of them is written) and string fields longer than MAX_FIELD_CHARS are cut.
+# Tracebacks travel separately from the message and are never cut.
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime
+
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "json"  # or "text"
+MAX_FIELD_CHARS = 500  # longer string fields are truncated
+PAYLOAD_SAMPLE_RATE = 0.01  # share of DEBUG response payloads that are written
+QUIET_LOGGERS = ("asyncio", "urllib3")  # libraries kept at WARNING even with --log-level DEBUG
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+def truncate(value, limit=MAX_FIELD_CHARS):
+    """Cut long strings, noting how much was dropped"""
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... [{len(value) - limit} more chars]"
+    return value
+
+def record_fields(record):
+    """The `extra` fields of a record, with long strings truncated"""
+    return {name: truncate(value) for name, value in vars(record).items()
+            if name not in _RECORD_ATTRIBUTES and name != "sample"}
+
+def exception_text(formatter, record):
+    """The traceback of `record`, whether it still has exc_info or came through the queue as text"""
+    if record.exc_info:
+        return formatter.formatException(record.exc_info)
+    return record.exc_text
+
+class TracebackQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that passes the traceback on as exc_text instead of folding it into the message"""
+
+    def prepare(self, record):
+        exc_text = exception_text(logging.Formatter(), record)
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None  # exc_text carries the formatted traceback
+        record.exc_text = exc_text
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": truncate(record.getMessage()),
+        }
+        entry.update(record_fields(record))
+        exc = exception_text(self, record)
+        if exc:
+            entry["exc"] = exc
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{name}={value}" for name, value in record_fields(record).items())
+        line = f"[{datetime.fromtimestamp(record.created)}] {record.getMessage()}"
+        if fields:
+            line += f" ({fields})"
+        exc = exception_text(self, record)
+        if exc:
+            line += "\n" + exc
+        return line
+
+class SampleFilter(logging.Filter):
+    """Pass records carrying a `sample` rate only with that probability"""
+
+    def filter(self, record):
+        rate = getattr(record, "sample", None)
+        return rate is None or random.random() < rate
+
+def configure(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """Route all logging through a queue to `stream` (default stdout); safe to call again"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    output.addFilter(SampleFilter())
+
+    records = queue.SimpleQueue()  # unbounded, so logging never blocks the caller
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(TracebackQueueHandler(records))
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+def shutdown():
+    """Write out everything still queued"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown)
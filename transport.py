@@ -0,0 +1,321 @@
+# Pluggable transport under http_client
+#
+# http_client.post() keeps the circuit breaker and metrics and hands the
+# request itself to the current transport:
+#
+#   http                real HTTP through the pooled requests.Session (default)
+#   simulated[:k=v,...] in-process stand-in for the research API with latency,
+#                       errors, 429 throttling and failure schedules; no network
+#   record:PATH         real HTTP, with every exchange appended to PATH (JSON lines)
+#   replay:PATH         answers with the exchanges recorded in PATH, in order
+#
+# so the processors run the same code path whether they talk to the API, to a
+# simulation at 100x the real volume, or to a recording of an earlier run.
+#
+#     python startup_batch_processor.py --transport simulated:latency=0.05,throttle_rate=0.1
+#     python startup_batch_processor.py --transport simulated:schedule=100-150@503+400-410@ConnectionError
+
+import json
+import math
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+RESEARCH_PATH = "/api/v1/research/"
+PUBLIC_COMPANY_PATH = "/api/v2/public-company/"
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+LOGNORMAL_SIGMA = 0.5  # spread of the lognormal latency distribution
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def sample_latency(mean, distribution="fixed", rng=random):
+    """Seconds to wait for one request, drawn from `distribution` with the given mean"""
+    if mean <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    if distribution == "lognormal":
+        # exp(sigma^2 / 2) is the mean of lognormvariate(0, sigma)
+        return rng.lognormvariate(0, LOGNORMAL_SIGMA) * mean / math.exp(LOGNORMAL_SIGMA ** 2 / 2)
+    return mean
+
+class Response:
+    """The parts of requests.Response the processors use"""
+
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = dict(headers or {})
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+def _raise(error_type, message):
+    """Raise the requests exception called `error_type` (ConnectionError when unknown)"""
+    import requests
+
+    error = getattr(requests.exceptions, error_type, None)
+    if not (isinstance(error, type) and issubclass(error, requests.exceptions.RequestException)):
+        error = requests.exceptions.ConnectionError
+    raise error(message)
+
+class HttpTransport:
+    """Real HTTP through http_client's pooled session"""
+
+    def post(self, url, **kwargs):
+        from http_client import get_session
+        return get_session().post(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        from http_client import get_session
+        return get_session().head(url, **kwargs)
+
+class SimulatedTransport:
+    """In-process model of the research API.
+
+    Each request waits a latency drawn from `distribution` (mean `latency`,
+    multiplied by `time_scale`; 0 skips sleeping) and is answered with 429 and
+    Retry-After: `retry_after` for a `throttle_rate` share and whenever more
+    than `requests_per_second` arrive, with 503 for an `error_rate` share, and
+    with 201 otherwise. The public-company endpoint reports a `reject_rate`
+    share of tickers as failed. `schedule` lists (first, last, outcome)
+    windows of request numbers (1-based, inclusive) answered with `outcome`,
+    an HTTP status or a requests exception name such as "ConnectionError" or
+    "Timeout", e.g. [(100, 150, 503)] for an outage. A `seed` makes the
+    random choices repeatable.
+
+    Like the real API, a request whose Idempotency-Key header repeats one
+    that was already accepted is answered with the original response rather
+    than starting another research job; `jobs_started` counts the jobs.
+    """
+
+    def __init__(self, latency=0.0, distribution="fixed", error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 reject_rate=0.0, requests_per_second=None, schedule=(), time_scale=1.0, seed=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"distribution must be one of {', '.join(DISTRIBUTIONS)}")
+        self.latency = latency
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.reject_rate = reject_rate
+        self.requests_per_second = requests_per_second
+        self.schedule = [(int(first), int(last), outcome) for first, last, outcome in schedule]
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.status_counts = {}  # HTTP status or exception name -> count
+        self.jobs_started = 0  # accepted requests that were not repeats of an earlier idempotency key
+        self.accepted = {}  # idempotency key -> (status, body) of the request that started its job
+        self.window_start = time.monotonic()  # one-second window for requests_per_second
+        self.window_count = 0
+
+    def _outcome(self, number):
+        """Status (or exception name) for request `number`; called under the lock"""
+        for first, last, outcome in self.schedule:
+            if first <= number <= last:
+                return outcome
+        if self.requests_per_second is not None:
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start, self.window_count = now, 0
+            self.window_count += 1
+            if self.window_count > self.requests_per_second:
+                return 429
+        roll = self.rng.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return 201
+
+    def respond(self, path, payload, idempotency_key=None):
+        """Count one request to `path` and decide its answer: (status or exception name, body, headers, latency)"""
+        with self.lock:
+            self.request_count += 1
+            if idempotency_key in self.accepted:
+                outcome, body = self.accepted[idempotency_key]
+                self.status_counts[outcome] = self.status_counts.get(outcome, 0) + 1
+                latency = sample_latency(self.latency, self.distribution, self.rng) * self.time_scale
+                return outcome, body, {"Idempotent-Replayed": "true"}, latency
+            outcome = self._outcome(self.request_count)
+            if not isinstance(outcome, str) and path not in (RESEARCH_PATH, PUBLIC_COMPANY_PATH):
+                outcome = 404
+            self.status_counts[outcome] = self.status_counts.get(outcome, 0) + 1
+            latency = sample_latency(self.latency, self.distribution, self.rng) * self.time_scale
+            rejected = [self.rng.random() < self.reject_rate for _ in payload.get("inputs", ())]
+        headers = {}
+        if isinstance(outcome, str):
+            body = None
+        elif outcome == 429:
+            body = {"error": "too many requests"}
+            headers["Retry-After"] = str(round(self.retry_after * self.time_scale))
+        elif outcome not in (200, 201):
+            body = {"error": f"simulated HTTP {outcome}"}
+        elif path == PUBLIC_COMPANY_PATH:
+            results = [{"ticker": ticker, "status": "failed" if reject else "success"}
+                       for ticker, reject in zip(payload.get("inputs", ()), rejected) if ticker != "YYZ"]
+            body = {"status": "queued", "results": results}
+        else:
+            body = {"status": "queued", "received": payload}
+        if outcome in (200, 201):
+            with self.lock:
+                self.jobs_started += 1
+                if idempotency_key is not None:
+                    self.accepted[idempotency_key] = (outcome, body)
+        return outcome, body, headers, latency
+
+    def post(self, url, data=None, **kwargs):
+        payload = kwargs.get("json") or (json.loads(data) if data else {})
+        idempotency_key = (kwargs.get("headers") or {}).get("Idempotency-Key")
+        outcome, body, headers, latency = self.respond(urlsplit(url).path, payload, idempotency_key)
+        timeout = kwargs.get("timeout")
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and latency > read_timeout:
+            time.sleep(read_timeout)
+            _raise("ReadTimeout", f"simulated read timeout ({read_timeout:.2f}s) for {url}")
+        if latency:
+            time.sleep(latency)
+        if isinstance(outcome, str):
+            _raise(outcome, f"simulated {outcome} for {url}")
+        return Response(outcome, json.dumps(body), {"Content-Type": "application/json", **headers})
+
+    def head(self, url, **kwargs):
+        return Response(200)
+
+class RecordingTransport:
+    """Sends through `inner` (default: real HTTP) and appends every exchange to `path`"""
+
+    def __init__(self, path, inner=None):
+        self.path = path
+        self.inner = inner or HttpTransport()
+        self.lock = threading.Lock()
+
+    def _write(self, exchange):
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(exchange) + "\n")
+
+    def post(self, url, **kwargs):
+        exchange = {"url": url, "data": kwargs.get("data"), "ts": time.time()}
+        start = time.monotonic()
+        try:
+            response = self.inner.post(url, **kwargs)
+        except Exception as e:
+            exchange.update(error_type=type(e).__name__, error=str(e), latency=time.monotonic() - start)
+            self._write(exchange)
+            raise
+        exchange.update(status=response.status_code, headers=dict(response.headers), text=response.text,
+                        latency=time.monotonic() - start)
+        self._write(exchange)
+        return response
+
+    def head(self, url, **kwargs):
+        return self.inner.head(url, **kwargs)
+
+class ReplayTransport:
+    """Answers with the exchanges in a RecordingTransport file.
+
+    Requests are matched to recorded ones by URL and body, in recorded order;
+    a request that was never recorded (or whose recordings are used up) gets
+    the next unused exchange for its URL. With `delay`, the recorded latency is
+    waited out again. Raises ConnectionError once nothing is left to replay.
+    """
+
+    def __init__(self, path, delay=False):
+        self.path = path
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.exchanges = {}  # (url, data) -> recorded exchanges, oldest first
+        self.by_url = {}  # url -> recorded exchanges, oldest first
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    exchange = json.loads(line)
+                    exchange["used"] = False
+                    self.exchanges.setdefault((exchange["url"], exchange.get("data")), []).append(exchange)
+                    self.by_url.setdefault(exchange["url"], []).append(exchange)
+
+    def _next(self, url, data):
+        with self.lock:
+            for candidates in (self.exchanges.get((url, data), ()), self.by_url.get(url, ())):
+                for exchange in candidates:
+                    if not exchange["used"]:
+                        exchange["used"] = True
+                        return exchange
+        return None
+
+    def post(self, url, data=None, **kwargs):
+        exchange = self._next(url, data)
+        if exchange is None:
+            _raise("ConnectionError", f"no recorded response left for {url} in {self.path}")
+        if self.delay and exchange.get("latency"):
+            time.sleep(exchange["latency"])
+        if "error_type" in exchange:
+            _raise(exchange["error_type"], exchange.get("error", ""))
+        return Response(exchange["status"], exchange.get("text", ""), exchange.get("headers"))
+
+    def head(self, url, **kwargs):
+        return Response(200)
+
+def _parse_schedule(text):
+    """"100-150@503+400-410@ConnectionError" -> [(100, 150, 503), (400, 410, "ConnectionError")]"""
+    schedule = []
+    for window in filter(None, text.split("+")):
+        numbers, _, outcome = window.partition("@")
+        first, _, last = numbers.partition("-")
+        schedule.append((int(first), int(last or first), int(outcome) if outcome.isdigit() else outcome))
+    return schedule
+
+def parse_transport(spec):
+    """Build a transport from a --transport value (see the top of this module)"""
+    kind, _, argument = spec.partition(":")
+    if kind == "http" and not argument:
+        return HttpTransport()
+    if kind == "record" and argument:
+        return RecordingTransport(argument)
+    if kind == "replay" and argument:
+        return ReplayTransport(argument)
+    if kind == "simulated":
+        options = {}
+        for pair in filter(None, argument.split(",")):
+            name, _, value = pair.partition("=")
+            if name == "schedule":
+                options[name] = _parse_schedule(value)
+            elif name == "distribution":
+                options[name] = value
+            elif name in ("seed", "requests_per_second", "retry_after"):
+                options[name] = int(value)
+            else:
+                options[name] = float(value)
+        try:
+            return SimulatedTransport(**options)
+        except TypeError as e:
+            raise ValueError(f"bad simulated transport option: {e}") from None
+    raise ValueError(f"unknown transport {spec!r}; use http, simulated[:k=v,...], record:PATH or replay:PATH")
+
+def get_transport():
+    """The transport http_client sends through, real HTTP unless set_transport() was called"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport()
+        return _transport
+
+def set_transport(transport):
+    """Send all further requests through `transport` (a transport object or --transport spec)"""
+    global _transport
+    if isinstance(transport, str):
+        transport = parse_transport(transport)
+    with _transport_lock:
+        _transport = transport
+    return transport
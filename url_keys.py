@@ -0,0 +1,47 @@
+# Canonical keys for company URLs
+#
+# Input lists mix "https://www.example.com/", "http://example.com" and bare
+# "example.com". Every lookup goes through url_key() so each company has
+# exactly one entry in the processed index.
+
+import re
+from urllib.parse import urlsplit
+
+LOCALE_SEGMENT = re.compile(r"^[a-z]{2}(?:[-_][a-z]{2})?$", re.IGNORECASE)  # en, jp, en-us, pt_BR
+INDEX_PAGES = {"index.html", "index.htm", "index.php"}
+DEFAULT_PORTS = {"80", "443"}
+
+def url_key(url):
+    """Return the canonical key for a company URL.
+
+    The key is the lower-cased host without scheme, ``www.`` or default port,
+    followed by the path only when it identifies something more specific than
+    the site itself. Query strings, fragments, trailing slashes, index pages
+    and a lone locale segment (``/en/``) are dropped, so
+    ``https://www.aidemy.co.jp/en/`` and ``aidemy.co.jp`` share one key.
+    """
+    url = url.strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = f"//{url}"
+    parts = urlsplit(url)
+
+    host = parts.netloc.lower().rsplit("@", 1)[-1]
+    if ":" in host:
+        name, port = host.rsplit(":", 1)
+        if port in DEFAULT_PORTS:
+            host = name
+    if host.startswith("www."):
+        host = host[4:]
+    host = host.rstrip(".")
+
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if segments and segments[-1].lower() in INDEX_PAGES:
+        segments.pop()
+    if len(segments) == 1 and LOCALE_SEGMENT.match(segments[0]):
+        segments.pop()
+
+    if not segments:
+        return host
+    return f"{host}/{'/'.join(segments)}"
@@ -0,0 +1,283 @@
+# SQLite work ledger for the batch processors
+#
+# One row per canonical item key with its state, attempt count and the
+# outcome of the last API call. Result writes are buffered and committed in
+# transactions so the ledger costs one fsync per group instead of per item.
+# Marking an item in flight is the exception: it is committed before the
+# request goes out, together with the item's idempotency key, so a crash
+# mid-request leaves a record of what may already have reached the API.
+
+import os
+import sqlite3
+import time
+import uuid
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"  # last attempt failed; sent again by the next run
+DEAD = "dead"  # gave up on; in the dead-letter store and only sent again by --replay-failed
+
+COMMIT_EVERY = 50  # buffered writes per transaction
+COMMIT_INTERVAL = 2.0  # seconds before buffered writes are committed regardless of count
+ENQUEUE_CHUNK = 10_000  # input items inserted per transaction
+PENDING_PAGE = 500  # pending items fetched per query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    item TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_status INTEGER,
+    last_latency_ms REAL,
+    last_error TEXT,
+    updated_at REAL,
+    idempotency_key TEXT
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class WorkLedger:
+    """Per-item processing state stored in an embedded SQLite database"""
+
+    def __init__(self, path, commit_every=COMMIT_EVERY, commit_interval=COMMIT_INTERVAL, before_flush=None):
+        self.path = path
+        self.before_flush = before_flush  # runs before buffered writes are committed, e.g. to make a progress journal durable first
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(items)")}
+        if "idempotency_key" not in columns:  # ledger written before idempotency keys were sent
+            with self.conn:
+                self.conn.execute("ALTER TABLE items ADD COLUMN idempotency_key TEXT")
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.buffer = []
+        self.last_commit = time.monotonic()
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (name, value) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                (name, str(value)),
+            )
+
+    def import_progress_file(self, path, key_fn):
+        """Mark entries of a text progress file as done.
+
+        Only lines appended since the previous import are read, so the file
+        is parsed once in full and afterwards costs a seek. Returns the number
+        of lines imported.
+        """
+        if not os.path.exists(path):
+            return 0
+        meta_name = f"imported:{os.path.abspath(path)}"
+        inode_name = f"imported-inode:{os.path.abspath(path)}"
+        offset = int(self.get_meta(meta_name, 0))
+        inode = self.get_meta(inode_name)
+        stat = os.stat(path)
+        if offset > stat.st_size or (inode is not None and int(inode) != stat.st_ino):
+            offset = 0  # file was rewritten (e.g. compacted); import it again
+
+        now = time.time()
+        imported = 0
+        rows = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # incomplete last line; pick it up next time
+                offset += len(raw)
+                item = raw.decode("utf-8", errors="replace").strip()
+                key = key_fn(item)
+                if key:
+                    rows.append((key, item, DONE, now))
+                if len(rows) >= ENQUEUE_CHUNK:
+                    imported += self._insert_done(rows)
+                    rows = []
+        imported += self._insert_done(rows)
+        self.set_meta(meta_name, offset)
+        self.set_meta(inode_name, stat.st_ino)
+        return imported
+
+    def _insert_done(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO items (key, item, state, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                rows,
+            )
+        return len(rows)
+
+    def enqueue(self, items, key_fn, chunk_size=ENQUEUE_CHUNK):
+        """Add items that are not in the ledger yet as pending.
+
+        `items` may be any iterable, including a generator over a file; it is
+        consumed in chunks so memory use does not depend on its length.
+        Returns (seen, added) counts.
+        """
+        seen = 0
+        added = 0
+        rows = []
+        for item in items:
+            seen += 1
+            key = key_fn(item)
+            if key:
+                rows.append((key, item))
+            if len(rows) >= chunk_size:
+                added += self._insert_pending(rows)
+                rows = []
+        if rows:
+            added += self._insert_pending(rows)
+        return seen, added
+
+    def add_new(self, items, key_fn):
+        """Add items whose key is not in the ledger yet as pending; returns those items.
+
+        Meant for the small batches a watched input grows by, where the
+        caller needs to know which items are new rather than just how many.
+        """
+        added = []
+        with self.conn:
+            for item in items:
+                key = key_fn(item)
+                if not key:
+                    continue
+                before = self.conn.total_changes
+                self.conn.execute("INSERT OR IGNORE INTO items (key, item) VALUES (?, ?)", (key, item))
+                if self.conn.total_changes > before:
+                    added.append(item)
+        return added
+
+    def _insert_pending(self, rows):
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO items (key, item) VALUES (?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def pending(self, page_size=PENDING_PAGE):
+        """Yield items that still need to be sent, in the order they were first queued.
+
+        Rows are fetched a page at a time by rowid, so no cursor stays open
+        while results for earlier items are being written.
+        """
+        last_rowid = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT rowid, item FROM items WHERE state IN (?, ?, ?) AND rowid > ? "
+                "ORDER BY rowid LIMIT ?",
+                (PENDING, IN_FLIGHT, FAILED, last_rowid, page_size),
+            ).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, item in rows:
+                yield item
+
+    def count_pending(self):
+        """Number of items pending, in flight or failed"""
+        counts = self.counts()
+        return counts.get(PENDING, 0) + counts.get(IN_FLIGHT, 0) + counts.get(FAILED, 0)
+
+    def counts(self):
+        """Number of items in each state"""
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM items GROUP BY state")
+        return dict(rows.fetchall())
+
+    def get_state(self, key):
+        """State of `key`, or None when it is not in the ledger"""
+        self.flush()
+        row = self.conn.execute("SELECT state FROM items WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def mark_in_flight(self, key):
+        """Mark `key` in flight and return its idempotency key, committed before the caller sends.
+
+        A new key is created unless the previous attempt, in this run or an
+        interrupted one, got no answer (see record_result); that attempt may
+        have reached the API, so the resend carries the same key.
+        """
+        self.flush()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE items SET state = ?, updated_at = ?, "
+                "idempotency_key = COALESCE(idempotency_key, ?) WHERE key = ?",
+                (IN_FLIGHT, time.time(), uuid.uuid4().hex, key),
+            )
+            row = self.conn.execute("SELECT idempotency_key FROM items WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def in_flight(self):
+        """(key, item, idempotency_key, updated_at) of every item still marked in flight"""
+        self.flush()
+        return self.conn.execute(
+            "SELECT key, item, idempotency_key, updated_at FROM items WHERE state = ? ORDER BY rowid",
+            (IN_FLIGHT,),
+        ).fetchall()
+
+    def record_result(self, key, result, dead=False):
+        """Buffer the outcome of one API call (a SendResult) for `key`; `dead` when it was the last attempt.
+
+        The idempotency key is kept only when the call got no answer and will
+        be retried; once the API has answered, the next attempt is a new request.
+        """
+        keep_key = not result.ok and result.status is None and not dead
+        self._write(
+            "UPDATE items SET state = ?, attempts = attempts + 1, last_status = ?, "
+            "last_latency_ms = ?, last_error = ?, updated_at = ?, "
+            "idempotency_key = CASE WHEN ? THEN idempotency_key END WHERE key = ?",
+            (
+                DONE if result.ok else DEAD if dead else FAILED,
+                result.status,
+                None if result.latency is None else result.latency * 1000,
+                result.error,
+                time.time(),
+                keep_key,
+                key,
+            ),
+        )
+
+    def clear_idempotency_keys(self, keys):
+        """Forget the idempotency keys of `keys`, so their next attempt is sent as a new request"""
+        self.flush()
+        with self.conn:
+            self.conn.executemany("UPDATE items SET idempotency_key = NULL WHERE key = ?", ((key,) for key in keys))
+
+    def mark_dead(self, keys):
+        """Move failed items among `keys` (e.g. those in the dead-letter store) to the dead state"""
+        self.flush()
+        with self.conn:
+            self.conn.executemany("UPDATE items SET state = ? WHERE key = ? AND state = ?",
+                                  ((DEAD, key, FAILED) for key in keys))
+
+    def _write(self, sql, params):
+        self.buffer.append((sql, params))
+        if (len(self.buffer) >= self.commit_every
+                or time.monotonic() - self.last_commit >= self.commit_interval):
+            self.flush()
+
+    def flush(self):
+        """Commit all buffered writes in one transaction"""
+        if self.buffer:
+            if self.before_flush:
+                self.before_flush()
+            with self.conn:
+                for sql, params in self.buffer:
+                    self.conn.execute(sql, params)
+            self.buffer = []
+        self.last_commit = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()